@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'AuroraMart.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings
+
+if getattr(settings, 'ML_WARM_UP_ON_STARTUP', False):
+    from customer_website.views import warm_up_models
+    warm_up_models(background=True)
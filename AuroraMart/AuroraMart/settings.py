@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -87,6 +88,22 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Shared by every worker on the host: the catalog snapshot, facet counts, rendered grids and the
+# version tokens that tell each worker to rebuild its category tree and autocomplete index all
+# live here, so a write in one worker is seen by the others. (The default LocMemCache is per
+# process.) Point this at Redis or Memcached when the site runs on more than one host. The
+# directory comes from DJANGO_CACHE_DIR, outside the source tree in deployments.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DJANGO_CACHE_DIR', BASE_DIR / 'django_cache'),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -142,3 +159,48 @@ DEFAULT_FROM_EMAIL = 'auroramart456@gmail.com'  # Replace with your Gmail addres
 
 # To use console backend for testing (prints to terminal):
 # EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+# Recommendation engine
+# Number of basket -> recommendations results kept in each worker's LRU cache
+RECOMMENDATION_CACHE_SIZE = 1024
+# Seconds between checks of prediction_data/ artifacts for a new version (None disables hot reload)
+MODEL_RELOAD_INTERVAL = 30
+# Load the ML artifacts in a background thread when a WSGI worker boots instead of on first use
+ML_WARM_UP_ON_STARTUP = False
+# Serve the artifacts from memory-mapped copies (see `manage.py export_mmap_artifacts`) so that
+# workers on one host share a single physical copy of the model data
+ML_MMAP_ARTIFACTS = False
+ML_MMAP_DIR = BASE_DIR / 'customer_website' / 'prediction_data' / 'mmap'
+# Predict a new customer's preferred category in a background thread instead of during the
+# onboarding POST; the customer starts as 'General' and the session picks up the prediction later
+ASYNC_PREFERRED_CATEGORY = False
+PREFERRED_CATEGORY_WORKERS = 2
+# Serve the preferred-category classifier from the NumPy export written by
+# `manage.py export_numpy_classifier`, so web workers don't import scikit-learn
+ML_NUMPY_CLASSIFIER = False
+# Unix socket of the inference sidecar (`manage.py run_inference_server`); None keeps the models
+# in-process. Calls that fail or take longer than INFERENCE_TIMEOUT seconds fall back to in-process
+INFERENCE_SOCKET = None
+INFERENCE_TIMEOUT = 0.5
+# Seconds the cached category/product-count snapshot is reused; Product and Category saves clear
+# it in the shared cache for every worker, this bounds staleness from bulk updates that skip signals
+CATALOG_CACHE_TIMEOUT = 300
+# Seconds a session reuses its next-best-action cards while its preferred category, browsing
+# history, cart and current category are unchanged; 0 recomputes them on every page
+NEXT_BEST_ACTION_TTL = 60
+# Page the storefront product list with cursors (seek on the sort key and SKU) instead of page
+# numbers; totals then come from a count cached for PRODUCT_COUNT_CACHE_TIMEOUT seconds
+PRODUCT_KEYSET_PAGINATION = False
+PRODUCT_COUNT_CACHE_TIMEOUT = 300
+# Seconds browsers may reuse a navbar autocomplete response (search/ajax/?mode=autocomplete)
+AUTOCOMPLETE_MAX_AGE = 60
+# Seconds a rendered product grid stays cached; Product and Category writes change every key at once
+FRAGMENT_CACHE_TIMEOUT = 300
+# Seconds between checks of the category tree's version token; bounds how long a category changed
+# in another process shows its old name or place here
+CATEGORY_TREE_CHECK_INTERVAL = 5
+# Seconds between checks of the per-currency price snapshot's version token; bounds how long a price
+# changed in another process shows its old value here
+PRICE_SNAPSHOT_CHECK_INTERVAL = 5
+# Rule metric ranking the product page's "Frequently Bought Together" (confidence, lift, ...)
+FREQUENTLY_BOUGHT_TOGETHER_METRIC = 'confidence'
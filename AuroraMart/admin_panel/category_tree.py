@@ -0,0 +1,114 @@
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Replaced on every Category write; each process rebuilds its tree when the
+# token in the (shared) cache differs from the one its tree was built under.
+# The token also expires, so writes that skip signals are picked up within
+# CATALOG_CACHE_TIMEOUT. Processes read it at most every
+# CATEGORY_TREE_CHECK_INTERVAL seconds.
+TREE_VERSION_KEY = 'admin_panel:category_tree_version'
+
+CHECK_INTERVAL = getattr(settings, 'CATEGORY_TREE_CHECK_INTERVAL', 5)
+
+
+@dataclass
+class CategoryNode:
+    category_id: str
+    name: str
+    parent_id: str = None
+    root_id: str = None
+    path: str = ''
+    # Category.path, for Category.subtree_filter().
+    id_path: str = ''
+    children: list = field(default_factory=list)
+
+    def is_main_category(self):
+        return self.parent_id is None
+
+
+class CategoryTree:
+    """Every category, read in one query; nodes are keyed by category id."""
+
+    def __init__(self, rows):
+        self.nodes = {}
+        self.main_categories = []
+        for category_id, name, parent_id, id_path in rows:
+            self.nodes[category_id] = CategoryNode(category_id, name, parent_id, id_path=id_path)
+        for node in self.nodes.values():
+            if node.parent_id is None:
+                self.main_categories.append(node)
+            elif node.parent_id in self.nodes:
+                self.nodes[node.parent_id].children.append(node)
+        for node in self.main_categories:
+            self._link(node, node.category_id, [])
+
+    def _link(self, node, root_id, names):
+        names = names + [node.name]
+        node.root_id = root_id
+        node.path = ' > '.join(names)
+        for child in node.children:
+            self._link(child, root_id, names)
+
+    def get(self, category_id):
+        return self.nodes.get(category_id)
+
+    def subtree_ids(self, category_id):
+        """The category's id followed by the ids of all its descendants."""
+        ids = []
+        stack = [self.nodes[category_id]] if category_id in self.nodes else []
+        while stack:
+            node = stack.pop()
+            ids.append(node.category_id)
+            stack.extend(node.children)
+        return ids
+
+    def sorted_by_name(self, nodes=None):
+        return sorted(self.nodes.values() if nodes is None else nodes, key=lambda node: node.name)
+
+    def choices(self, nodes, empty_label=None):
+        """(id, name) choices for a category select, led by the empty label if given."""
+        choices = [('', empty_label)] if empty_label is not None else []
+        choices.extend((node.category_id, node.name) for node in nodes)
+        return choices
+
+
+_lock = threading.Lock()
+_tree = (None, None, 0.0)
+
+
+def build_category_tree():
+    from .models import Category
+
+    return CategoryTree(Category.objects.values_list('category_id', 'name', 'parent_category_id', 'path').order_by('pk'))
+
+
+def get_category_tree():
+    global _tree
+    _, tree, checked_at = _tree
+    now = time.monotonic()
+    # Every category label goes through here; read the token at most every CHECK_INTERVAL seconds.
+    if tree is not None and now - checked_at < CHECK_INTERVAL:
+        return tree
+    version = cache.get(TREE_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(TREE_VERSION_KEY, version, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+        version = cache.get(TREE_VERSION_KEY, version)
+    with _lock:
+        tree_version, tree, _ = _tree
+        if tree is None or tree_version != version:
+            tree = build_category_tree()
+        _tree = (version, tree, now)
+    return tree
+
+
+def invalidate_category_tree(**kwargs):
+    global _tree
+    with _lock:
+        _tree = (None, None, 0.0)
+    cache.set(TREE_VERSION_KEY, uuid.uuid4().hex, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
@@ -2,6 +2,7 @@ import re
 from django.contrib.auth.forms import AuthenticationForm
 from django import forms
 from admin_panel.models import Admin,Category,Product,Order,OrderItem, Coupon, CouponUsage
+from admin_panel.category_tree import get_category_tree
 from customer_website.models import Customer
 from AuroraMart.models import User
 from .models import Review
@@ -151,8 +152,12 @@ class ProductForm(forms.ModelForm):
         if self.instance.pk:
             self.fields['sku'].disabled = True
         
+        # Options come from the cached category tree; the querysets are
+        # only used to validate the submitted ids.
+        tree = get_category_tree()
         self.fields['category'].queryset = Category.objects.filter(parent_category__isnull=True)
         self.fields['category'].empty_label = "Select a main category"
+        self.fields['category'].choices = tree.choices(tree.main_categories, self.fields['category'].empty_label)
         self.fields['category'].widget.attrs.update({
             'id': 'id_category',
             'class': 'form-control category-selector',
@@ -160,16 +165,14 @@ class ProductForm(forms.ModelForm):
         })
 
         if self.data and self.data.get('category'):
-            try:
-                category_id = self.data.get('category')
-                selected_category = Category.objects.get(pk=category_id)
-                self.fields['subcategory'].queryset = Category.objects.filter(parent_category=selected_category)
-            except (ValueError, Category.DoesNotExist):
-                self.fields['subcategory'].queryset = Category.objects.none()
-        elif self.instance.pk and self.instance.category:
-            self.fields['subcategory'].queryset = Category.objects.filter(
-                parent_category=self.instance.category
-            )
+            selected_category = tree.get(self.data.get('category'))
+        elif self.instance.pk and self.instance.category_id:
+            selected_category = tree.get(self.instance.category_id)
+        else:
+            selected_category = None
+
+        if selected_category:
+            self.fields['subcategory'].queryset = Category.objects.filter(parent_category=selected_category.category_id)
         else:
             self.fields['subcategory'].queryset = Category.objects.none()
         
@@ -226,8 +229,12 @@ class CategoryForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Filter parent_category to only show main categories (where parent_category is null)
+        tree = get_category_tree()
         self.fields['parent_category'].queryset = Category.objects.filter(parent_category__isnull=True)
         self.fields['parent_category'].empty_label = "Select a main category (leave blank for main category)"
+        self.fields['parent_category'].choices = tree.choices(
+            tree.main_categories, self.fields['parent_category'].empty_label,
+        )
 
 class OrderItemForm(forms.ModelForm):
     class Meta:
@@ -339,10 +346,8 @@ class CouponForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        choices = [('', 'All Categories')]
-        for category in Category.objects.filter(parent_category__isnull=True):
-            choices.append((str(category.pk), category.name))
-        self.fields['applicable_categories'].choices = choices
+        tree = get_category_tree()
+        self.fields['applicable_categories'].choices = tree.choices(tree.main_categories, 'All Categories')
         
         # Set up assigned_customers choices
         customer_choices = [('', 'All Customers')]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:36
+
+from django.db import migrations, models
+
+
+def backfill_paths(apps, schema_editor):
+    Category = apps.get_model('admin_panel', 'Category')
+    Product = apps.get_model('admin_panel', 'Product')
+
+    parents = dict(Category.objects.values_list('category_id', 'parent_category_id'))
+    paths = {}
+
+    def path_of(category_id):
+        if category_id not in paths:
+            parent_id = parents[category_id]
+            paths[category_id] = (path_of(parent_id) if parent_id else '') + f"{category_id}/"
+        return paths[category_id]
+
+    categories = list(Category.objects.only('category_id'))
+    for category in categories:
+        category.path = path_of(category.category_id)
+    Category.objects.bulk_update(categories, ['path'], batch_size=500)
+
+    products = list(Product.objects.only('sku', 'category_id', 'subcategory_id'))
+    for product in products:
+        category_id = product.subcategory_id or product.category_id
+        product.category_path = path_of(category_id) if category_id else ''
+    Product.objects.bulk_update(products, ['category_path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0017_coupon_assigned_customers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='category_path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=500),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0018_category_path'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['product_name', 'sku'], name='product_name_sku_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['unit_price', 'sku'], name='product_price_sku_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['product_rating', 'sku'], name='product_rating_sku_idx'),
+        ),
+    ]
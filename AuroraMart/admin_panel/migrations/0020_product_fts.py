@@ -0,0 +1,50 @@
+from django.db import migrations
+
+# The index stores each product's sku rather than relying on
+# admin_panel_product.rowid, which VACUUM and SQLite's table rebuilds (most
+# ALTERs Django makes) renumber. There are no triggers, as a rebuild of the
+# product table fails on triggers that name it; customer_website.product_search
+# keeps the index in sync from model signals instead.
+
+# Category names of product row `{row}`: its category, then its subcategory.
+CATEGORY_NAMES = (
+    "trim(coalesce((SELECT name FROM admin_panel_category WHERE category_id = {row}.category_id), '')"
+    " || ' ' || coalesce((SELECT name FROM admin_panel_category WHERE category_id = {row}.subcategory_id), ''))"
+)
+
+CREATE_SQL = [
+    # prefix='2 3' adds prefix indexes, so 2- and 3-character prefix
+    # queries (the first keystrokes in the search box) are cheap as well.
+    "CREATE VIRTUAL TABLE admin_panel_product_fts USING fts5("
+    "sku UNINDEXED, product_name, description, category_name, "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    # ORDER BY rank then uses these bm25() column weights: sku (not searched), name, description, category.
+    "INSERT INTO admin_panel_product_fts (admin_panel_product_fts, rank) VALUES ('rank', 'bm25(0.0, 10.0, 1.0, 4.0)')",
+    "INSERT INTO admin_panel_product_fts (sku, product_name, description, category_name) "
+    "SELECT p.sku, p.product_name, p.description, " + CATEGORY_NAMES.format(row='p') + " FROM admin_panel_product p",
+]
+
+DROP_SQL = [
+    "DROP TABLE IF EXISTS admin_panel_product_fts",
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        # FTS5 is SQLite only; other databases fall back to LIKE searches.
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0019_product_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE_SQL), run(DROP_SQL)),
+    ]
@@ -1,7 +1,8 @@
 from datetime import timedelta
 import uuid
 from django.db import models
-from django.db.models import Avg
+from django.db.models import Avg, Value
+from django.db.models.functions import Concat, Substr
 from AuroraMart.models import User
 from customer_website.models import Customer
 from django.contrib.auth.hashers import make_password, check_password
@@ -9,6 +10,8 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
 from django.utils import timezone
 
+from .category_tree import get_category_tree
+
 # Create your models here.
 class Admin(User):
     ROLE_CHOICES = [
@@ -39,16 +42,52 @@ class Category(models.Model):
         blank=True, 
         related_name='subcategories',
     )
+    # Ids from the root down to this category, each followed by '/'. Kept up
+    # to date by save(), so a subtree is one range on an indexed column.
+    path = models.CharField(max_length=500, blank=True, default='', editable=False, db_index=True)
 
     def __str__(self):
-        if self.parent_category:
-            return f"{self.parent_category.name} > {self.name}"
-        return self.name
+        if self.parent_category_id is None:
+            return self.name
+        # Look the parent up in the cached tree rather than querying it for
+        # every category rendered in a list or a select.
+        parent = get_category_tree().get(self.parent_category_id)
+        parent_name = parent.name if parent else self.parent_category.name
+        return f"{parent_name} > {self.name}"
     
     def save(self,*args, **kwargs):
         if not self.category_id:
             self.category_id = "CAT-" + str(uuid.uuid4())
-        return super().save(*args, **kwargs)
+        old_path = self.path
+        self.path = self.build_path()
+        result = super().save(*args, **kwargs)
+        if old_path and old_path != self.path:
+            self.move_subtree(old_path)
+        return result
+
+    def build_path(self):
+        parent_path = self.parent_category.path if self.parent_category_id else ''
+        return f"{parent_path}{self.category_id}/"
+
+    def move_subtree(self, old_path):
+        """Rewrites the paths below this category after it moved from old_path."""
+        def moved(field):
+            return Concat(Value(self.path), Substr(field, len(old_path) + 1), output_field=models.CharField())
+
+        Category.objects.filter(**Category.subtree_filter(old_path)).exclude(pk=self.pk).update(path=moved('path'))
+        Product.objects.filter(**Category.subtree_filter(old_path, 'category_path')).update(
+            category_path=moved('category_path'),
+        )
+
+    @staticmethod
+    def subtree_filter(path, field='path'):
+        """Lookups matching `field` values at or below `path`.
+
+        A range rather than __startswith: SQLite's LIKE is case-insensitive
+        and can't use the index on these columns. Every path ends in '/',
+        and '0' is the character after it.
+        """
+        return {f'{field}__gte': path, f'{field}__lt': path[:-1] + '0'}
     
     def is_main_category(self):
         """Returns True if this is a main category (no parent)"""
@@ -60,9 +99,14 @@ class Category(models.Model):
     
     def get_main_category(self):
         """Returns the main category (root) for this category"""
-        if self.parent_category:
+        if self.parent_category_id is None:
+            return self
+        tree = get_category_tree()
+        parent = tree.get(self.parent_category_id)
+        root = tree.get(parent.root_id) if parent else None
+        if root is None:
             return self.parent_category.get_main_category()
-        return self
+        return Category.from_db(self._state.db, ['category_id', 'name', 'parent_category_id'], [root.category_id, root.name, None])
     
     class Meta:
         verbose_name_plural = "Categories"
@@ -93,10 +137,57 @@ class Product(models.Model):
         blank=False,
         related_name='subcategory_products',
     )
+    # Category.path of the subcategory, or of the category when there is none.
+    category_path = models.CharField(max_length=500, blank=True, default='', editable=False, db_index=True)
 
     def __str__(self):
         return self.product_name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        product = super().from_db(db, field_names, values)
+        product._stored_in_stock = product._in_stock()
+        return product
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.category_path = self.build_category_path()
+        elif set(update_fields) & {'category', 'category_id', 'subcategory', 'subcategory_id'}:
+            self.category_path = self.build_category_path()
+            kwargs['update_fields'] = [*update_fields, 'category_path']
+        super().save(*args, **kwargs)
+        self._stored_in_stock = self._in_stock()
+
+    def _in_stock(self):
+        quantity = self.__dict__.get('quantity_on_hand')
+        return None if quantity is None else quantity > 0
+
+    def stock_status_changed(self):
+        """Whether this save sold the product out or restocked it; True when that isn't known.
+
+        Meant for post_save handlers: the stored status is updated after them.
+        """
+        stored = getattr(self, '_stored_in_stock', None)
+        return stored is None or stored != self._in_stock()
+
+    def build_category_path(self):
+        """category_path for the current category fields; bulk_create() callers must set it themselves."""
+        if self.subcategory_id:
+            return self.subcategory.path
+        if self.category_id:
+            return self.category.path
+        return ''
+
+    class Meta:
+        # One per storefront sort order, with sku as the tiebreaker that
+        # keyset pagination seeks on.
+        indexes = [
+            models.Index(fields=['product_name', 'sku'], name='product_name_sku_idx'),
+            models.Index(fields=['unit_price', 'sku'], name='product_price_sku_idx'),
+            models.Index(fields=['product_rating', 'sku'], name='product_rating_sku_idx'),
+        ]
+
 class Review(models.Model):
     RATING_CHOICES = [
         (1, '1 Star'),
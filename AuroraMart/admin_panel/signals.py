@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+
+from .category_tree import invalidate_category_tree
+from .models import Category, Product
+
+
+def refresh_product_category_paths(sender, instance, **kwargs):
+    """Re-derives category_path for products whose category was deleted (and set to NULL)."""
+    if not instance.path:
+        return
+    products = list(
+        Product.objects.filter(**Category.subtree_filter(instance.path, 'category_path'))
+        .select_related('category', 'subcategory')
+    )
+    for product in products:
+        product.category_path = product.build_category_path()
+    Product.objects.bulk_update(products, ['category_path'])
+
+
+post_save.connect(invalidate_category_tree, sender=Category, dispatch_uid='category_tree_save')
+post_delete.connect(invalidate_category_tree, sender=Category, dispatch_uid='category_tree_delete')
+post_delete.connect(refresh_product_category_paths, sender=Category, dispatch_uid='product_category_paths_delete')
@@ -1,3 +1,165 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from .category_tree import get_category_tree
+from .models import Category, Product
+
+
+# The suite clears the cache; keep it away from the dev server's shared one.
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CategoryTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def category(self, category_id, name, parent=None):
+        return Category.objects.create(category_id=category_id, name=name, parent_category=parent)
+
+    def product(self, sku, category, subcategory=None, **fields):
+        fields.setdefault('unit_price', Decimal('10.00'))
+        return Product.objects.create(
+            sku=sku, product_name=fields.pop('product_name', sku), description=fields.pop('description', ''),
+            category=category, subcategory=subcategory, **fields,
+        )
+
+
+class CategoryPathTests(CategoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.home = self.category('CAT-1', 'Home')
+        self.kitchen = self.category('CAT-2', 'Kitchen', self.home)
+        self.knives = self.category('CAT-3', 'Knives', self.kitchen)
+        self.garden = self.category('CAT-4', 'Garden')
+
+    def paths(self):
+        return dict(Category.objects.values_list('category_id', 'path'))
+
+    def test_paths_follow_the_parents(self):
+        self.assertEqual(self.paths(), {
+            'CAT-1': 'CAT-1/', 'CAT-2': 'CAT-1/CAT-2/', 'CAT-3': 'CAT-1/CAT-2/CAT-3/', 'CAT-4': 'CAT-4/',
+        })
+
+    def test_subtree_filter(self):
+        in_kitchen = Category.objects.filter(**Category.subtree_filter(self.kitchen.path))
+        self.assertEqual(sorted(in_kitchen.values_list('pk', flat=True)), ['CAT-2', 'CAT-3'])
+        in_home = Category.objects.filter(**Category.subtree_filter(self.home.path))
+        self.assertEqual(sorted(in_home.values_list('pk', flat=True)), ['CAT-1', 'CAT-2', 'CAT-3'])
+
+    def test_subtree_filter_does_not_match_ids_sharing_a_prefix(self):
+        # 'CAT-1/' must not match 'CAT-10/', nor compare case-insensitively.
+        self.category('CAT-10', 'Toys')
+        self.category('cat-1', 'Lowercase')
+        in_home = Category.objects.filter(**Category.subtree_filter(self.home.path))
+        self.assertEqual(sorted(in_home.values_list('pk', flat=True)), ['CAT-1', 'CAT-2', 'CAT-3'])
+
+    def test_moving_a_category_moves_its_subtree(self):
+        knife = self.product('SKU-1', self.kitchen, self.knives)
+        pan = self.product('SKU-2', self.kitchen)
+
+        self.kitchen.parent_category = self.garden
+        self.kitchen.save()
+
+        self.assertEqual(self.paths()['CAT-2'], 'CAT-4/CAT-2/')
+        self.assertEqual(self.paths()['CAT-3'], 'CAT-4/CAT-2/CAT-3/')
+        self.assertEqual(self.paths()['CAT-1'], 'CAT-1/')
+        knife.refresh_from_db()
+        pan.refresh_from_db()
+        self.assertEqual(knife.category_path, 'CAT-4/CAT-2/CAT-3/')
+        self.assertEqual(pan.category_path, 'CAT-4/CAT-2/')
+
+    def test_move_subtree_leaves_other_trees_alone(self):
+        shovel = self.product('SKU-1', self.garden)
+        self.knives.parent_category = self.home
+        self.knives.save()
+
+        self.assertEqual(self.paths()['CAT-3'], 'CAT-1/CAT-3/')
+        self.assertEqual(self.paths()['CAT-2'], 'CAT-1/CAT-2/')
+        shovel.refresh_from_db()
+        self.assertEqual(shovel.category_path, 'CAT-4/')
+
+    def test_deleting_a_subcategory_falls_back_to_the_category_path(self):
+        knife = self.product('SKU-1', self.kitchen, self.knives)
+        self.knives.delete()
+        knife.refresh_from_db()
+        self.assertEqual(knife.category_path, 'CAT-1/CAT-2/')
+
+
+class CategoryTreeTests(CategoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.home = self.category('CAT-1', 'Home')
+
+    def test_version_is_read_at_most_every_interval(self):
+        get_category_tree()
+        with mock.patch('admin_panel.category_tree.cache') as shared_cache:
+            for _ in range(3):
+                self.assertEqual(get_category_tree().get('CAT-1').name, 'Home')
+        shared_cache.get.assert_not_called()
+
+    def test_writes_in_this_process_show_at_once(self):
+        get_category_tree()
+        self.home.name = 'House'
+        self.home.save()
+        self.assertEqual(get_category_tree().get('CAT-1').name, 'House')
+
+
+class ProductCategoryPathTests(CategoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.home = self.category('CAT-1', 'Home')
+        self.kitchen = self.category('CAT-2', 'Kitchen', self.home)
+        self.product('SKU-1', self.home, self.kitchen)
+
+    def test_save_derives_the_path(self):
+        self.assertEqual(Product.objects.get(pk='SKU-1').category_path, 'CAT-1/CAT-2/')
+
+    def test_update_fields_without_category_skip_the_path(self):
+        product = Product.objects.get(pk='SKU-1')
+        product.quantity_on_hand = 3
+        with self.assertNumQueries(1):
+            product.save(update_fields=['quantity_on_hand'])
+
+    def test_update_fields_with_category_save_the_path(self):
+        product = Product.objects.get(pk='SKU-1')
+        product.subcategory = None
+        product.save(update_fields=['subcategory'])
+        self.assertEqual(Product.objects.get(pk='SKU-1').category_path, 'CAT-1/')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ProductSchemaChangeTests(TransactionTestCase):
+    """Product migrations rebuild the table on SQLite; search must survive them."""
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(category_id='CAT-1', name='Kitchen')
+        Product.objects.create(
+            sku='SKU-1', product_name='Steel kettle', description='', unit_price=Decimal('10.00'), category=category,
+        )
+
+    def alter_product_name(self, max_length):
+        old_field = Product._meta.get_field('product_name')
+        new_field = old_field.clone()
+        new_field.set_attributes_from_name('product_name')
+        new_field.max_length = max_length
+        new_field.model = Product
+        with connection.schema_editor() as editor:
+            editor.alter_field(Product, old_field, new_field)
+
+    def test_search_after_altering_a_product_field(self):
+        from customer_website.product_search import search_products
+
+        max_length = Product._meta.get_field('product_name').max_length
+        self.alter_product_name(max_length + 50)
+        self.addCleanup(self.alter_product_name, max_length)
+
+        Product.objects.create(sku='SKU-2', product_name='Copper kettle', description='', unit_price=Decimal('5.00'))
+        found = search_products(Product.objects.all(), 'kettle', ranked=True)
+        self.assertEqual(sorted(p.sku for p in found), ['SKU-1', 'SKU-2'])
+        self.assertEqual([p.sku for p in search_products(Product.objects.all(), 'kitchen')], ['SKU-1'])
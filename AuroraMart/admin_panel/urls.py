@@ -1,11 +1,12 @@
 from django.urls import path
-from .views import AdminDashboardView, AdminTableView, DashboardFilterView, loginview, logoutview, profileSettingsView, signupview
+from .views import AdminDashboardView, AdminTableView, CacheStatsView, DashboardFilterView, loginview, logoutview, profileSettingsView, signupview
 
 urlpatterns = [
     path('login/', loginview.as_view(), name='admin_login'),
     path('signup/', signupview.as_view(), name='admin_signup'),
     path('dashboard/', AdminDashboardView.as_view(), name='admin_dashboard'),        # main dashboard
     path('dashboard/filter/', DashboardFilterView.as_view(), name='dashboard_filter'),  # AJAX endpoint
+    path('dashboard/cache-stats/', CacheStatsView.as_view(), name='cache_stats'),  # JSON, per process
     path('list/', AdminTableView.as_view(), name='admin_list'), 
     path('logout/', logoutview, name='admin_logout'),
     path('profile/', profileSettingsView.as_view(), name='admin_profile'),
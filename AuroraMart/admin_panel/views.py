@@ -247,6 +247,20 @@ class DashboardFilterView(View):
         })
 
 
+class CacheStatsView(View):
+    """JSON hit rates of the storefront's in-process caches, for tuning them."""
+
+    def get(self, request, *args, **kwargs):
+        from customer_website.fragment_cache import fragment_cache
+        from customer_website.views import next_best_action_cache, recommendation_cache
+
+        return JsonResponse({
+            'next_best_action': next_best_action_cache.stats(),
+            'recommendations': recommendation_cache.stats(),
+            'fragments': fragment_cache.stats(),
+        })
+
+
 class AdminTableView(AdminBaseView):
     template_name = 'admin_panel/table_view.html'
     view_configs = {
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CustomerWebsiteConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'customer_website'
+
+    def ready(self):
+        from . import signals  # noqa: F401
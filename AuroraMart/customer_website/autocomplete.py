@@ -0,0 +1,182 @@
+"""In-process prefix index for the navbar search box.
+
+Every word of a product name starts one entry: the normalized name from
+that word on, e.g. "aurora wireless lamp", "wireless lamp" and "lamp".
+The entries are kept in a sorted list, so the products whose name has a
+word starting with the typed text are a bisect away and the first k of
+them cost O(log n + k).
+
+Product saves and deletes in this process update the index in place once
+their transaction commits. Other processes notice the version token in
+the (shared) Django cache change and rebuild theirs on the next lookup.
+The token also expires, so writes that skip signals are picked up within
+CATALOG_CACHE_TIMEOUT.
+"""
+import bisect
+import re
+import threading
+import unicodedata
+import uuid
+from collections import namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'customer_website:autocomplete_version'
+
+Suggestion = namedtuple('Suggestion', 'sku name unit_price image_url category')
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def normalize(text):
+    """Lowercase words without accents, separated by single spaces."""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(WORD_RE.findall(text.lower()))
+
+
+def name_keys(name):
+    words = normalize(name).split(' ')
+    return [' '.join(words[i:]) for i in range(len(words)) if words[i]]
+
+
+class PrefixIndex:
+    def __init__(self, products=()):
+        self.suggestions = {suggestion.sku: suggestion for suggestion in products}
+        entries = sorted(
+            (key, sku) for sku, suggestion in self.suggestions.items() for key in name_keys(suggestion.name)
+        )
+        # (keys, skus), replaced as a whole by add() and remove(), so that
+        # search() reads a consistent pair without taking a lock.
+        self._entries = ([key for key, _ in entries], [sku for _, sku in entries])
+
+    def __len__(self):
+        return len(self.suggestions)
+
+    def search(self, query, limit=10):
+        """Up to `limit` suggestions whose name has a word starting with `query`."""
+        prefix = normalize(query)
+        if not prefix or limit <= 0:
+            return []
+        keys, skus = self._entries
+        results = []
+        seen = set()
+        position = bisect.bisect_left(keys, prefix)
+        while position < len(keys) and keys[position].startswith(prefix):
+            sku = skus[position]
+            # .get(): a concurrent remove() may have dropped it already.
+            suggestion = self.suggestions.get(sku)
+            if suggestion is not None and sku not in seen:
+                seen.add(sku)
+                results.append(suggestion)
+                if len(results) == limit:
+                    break
+            position += 1
+        return results
+
+    def add(self, suggestion):
+        keys, skus = (list(entries) for entries in self._entries)
+        previous = self.suggestions.get(suggestion.sku)
+        if previous is not None:
+            self._drop(previous, keys, skus)
+        for key in name_keys(suggestion.name):
+            position = bisect.bisect_left(keys, key)
+            keys.insert(position, key)
+            skus.insert(position, suggestion.sku)
+        self.suggestions[suggestion.sku] = suggestion
+        self._entries = (keys, skus)
+
+    def remove(self, sku):
+        suggestion = self.suggestions.pop(sku, None)
+        if suggestion is None:
+            return
+        keys, skus = (list(entries) for entries in self._entries)
+        self._drop(suggestion, keys, skus)
+        self._entries = (keys, skus)
+
+    @staticmethod
+    def _drop(suggestion, keys, skus):
+        for key in name_keys(suggestion.name):
+            position = bisect.bisect_left(keys, key)
+            while position < len(keys) and keys[position] == key and skus[position] != suggestion.sku:
+                position += 1
+            # Missing entries are skipped: there is nothing left to remove.
+            if position < len(keys) and keys[position] == key:
+                del keys[position]
+                del skus[position]
+
+
+def build_prefix_index():
+    from admin_panel.models import Product
+
+    rows = Product.objects.values_list('sku', 'product_name', 'unit_price', 'product_image', 'category__name')
+    return PrefixIndex(
+        Suggestion(sku, name, unit_price, image or None, category) for sku, name, unit_price, image, category in rows
+    )
+
+
+_lock = threading.Lock()
+_index = (None, None)
+
+
+def get_prefix_index():
+    global _index
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(VERSION_KEY, version, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+        version = cache.get(VERSION_KEY, version)
+    index_version, index = _index
+    if index is None or index_version != version:
+        index = build_prefix_index()
+        with _lock:
+            _index = (version, index)
+    return index
+
+
+def _updated(change):
+    """Applies `change` to this process's index and tells other processes to rebuild."""
+    global _index
+    version = uuid.uuid4().hex
+    with _lock:
+        index_version, index = _index
+        current = cache.get(VERSION_KEY)
+        cache.set(VERSION_KEY, version, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+        if index is not None and index_version == current:
+            change(index)
+            _index = (version, index)
+        else:
+            # Already behind another process's changes: rebuild on next use.
+            _index = (None, None)
+
+
+def product_saved(sender, instance, using=None, **kwargs):
+    from admin_panel.category_tree import get_category_tree
+
+    node = get_category_tree().get(instance.category_id) if instance.category_id else None
+    suggestion = Suggestion(
+        instance.sku, instance.product_name, Decimal(str(instance.unit_price)), instance.product_image or None,
+        node.name if node else None,
+    )
+    # After the commit, so that other processes rebuild from the new name.
+    transaction.on_commit(lambda: _updated(lambda index: index.add(suggestion)), using=using)
+
+
+def product_deleted(sender, instance, using=None, **kwargs):
+    sku = instance.sku
+    transaction.on_commit(lambda: _updated(lambda index: index.remove(sku)), using=using)
+
+
+def _invalidate():
+    global _index
+    with _lock:
+        _index = (None, None)
+    cache.set(VERSION_KEY, uuid.uuid4().hex, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+
+
+def invalidate_prefix_index(using=None, **kwargs):
+    """Rebuild from scratch, for changes such as a category rename that touch many entries."""
+    transaction.on_commit(_invalidate, using=using)
@@ -0,0 +1,88 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .models import Customer
+
+logger = logging.getLogger(__name__)
+
+# Stored on the customer until the prediction lands; the same value the
+# synchronous path falls back to when there is no prediction.
+PROVISIONAL_CATEGORY = 'General'
+# The session holds {'token': ..., 'started': ...} while a prediction runs;
+# the worker marks the token done in the shared cache when it finishes.
+# (The prediction itself may well be PROVISIONAL_CATEGORY.)
+PENDING_SESSION_KEY = 'preferred_category_pending'
+DONE_KEY = 'customer_website:preferred_category_done:{token}'
+# Stop waiting for a prediction that was lost with its worker.
+PENDING_TIMEOUT = 60
+
+_executor = None
+_lock = threading.Lock()
+# customer_id -> token of the newest submitted prediction, so that a slow
+# prediction never overwrites one for details submitted after it.
+_latest = {}
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'PREFERRED_CATEGORY_WORKERS', 2),
+                thread_name_prefix='preferred-category',
+            )
+        return _executor
+
+
+def predict_preferred_category_later(request, customer, customer_data):
+    """Predicts the customer's preferred category off the request path.
+
+    The customer keeps PROVISIONAL_CATEGORY until the prediction is saved;
+    refresh_pending_category() copies it into the session on a later request.
+    """
+    token = uuid.uuid4().hex
+    with _lock:
+        _latest[customer.customer_id] = token
+    request.session[PENDING_SESSION_KEY] = {'token': token, 'started': time.time()}
+    get_executor().submit(_predict_and_save, customer.customer_id, dict(customer_data), token)
+
+
+def _predict_and_save(customer_id, customer_data, token):
+    from .views import predict_preferred_category
+
+    try:
+        prediction = predict_preferred_category(customer_data)
+        category = str(prediction[0]) if len(prediction) else PROVISIONAL_CATEGORY
+        with _lock:
+            if _latest.get(customer_id) != token:
+                return
+        Customer.objects.filter(customer_id=customer_id).update(preferred_category=category)
+    except Exception:
+        logger.exception("Failed to predict the preferred category of customer %s", customer_id)
+    finally:
+        with _lock:
+            if _latest.get(customer_id) == token:
+                del _latest[customer_id]
+        # Failed predictions are done too: the customer keeps PROVISIONAL_CATEGORY.
+        cache.set(DONE_KEY.format(token=token), True, PENDING_TIMEOUT)
+        # Each pool thread has its own connection; don't leave it open.
+        connection.close()
+
+
+def refresh_pending_category(request, customer):
+    """Puts a finished background prediction into the session."""
+    pending = request.session.get(PENDING_SESSION_KEY)
+    if pending is None:
+        return
+    done_key = DONE_KEY.format(token=pending['token'])
+    if cache.get(done_key) or time.time() - pending['started'] > PENDING_TIMEOUT:
+        request.session['preferred_category'] = customer.preferred_category
+        request.session.pop(PENDING_SESSION_KEY, None)
+        cache.delete(done_key)
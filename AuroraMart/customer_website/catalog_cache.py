@@ -0,0 +1,80 @@
+import random
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import cache
+
+from admin_panel.models import Category, Product
+
+CATALOG_CACHE_KEY = 'customer_website:catalog_snapshot'
+
+
+@dataclass
+class CatalogSnapshot:
+    """Category and product facts used on every catalog page, read in one query.
+
+    main_categories keeps the database order of the top-level categories as
+    category ids; the other maps are keyed by category id unless named otherwise.
+    """
+    main_categories: list = field(default_factory=list)
+    names: dict = field(default_factory=dict)
+    ids_by_name: dict = field(default_factory=dict)
+    product_counts: dict = field(default_factory=dict)
+    reorder_totals: dict = field(default_factory=dict)
+    sku_categories: dict = field(default_factory=dict)
+    category_skus: dict = field(default_factory=dict)
+
+
+def build_catalog_snapshot():
+    # Category LEFT JOIN products: one row per (category, product) and one
+    # row with NULL product columns for each empty category.
+    rows = Category.objects.values_list(
+        'category_id', 'name', 'parent_category_id', 'products__sku', 'products__reorder_quantity',
+    ).order_by('pk')
+
+    snapshot = CatalogSnapshot()
+    for category_id, name, parent_id, sku, reorder_quantity in rows:
+        if category_id not in snapshot.names:
+            snapshot.names[category_id] = name
+            snapshot.ids_by_name[name] = category_id
+            snapshot.product_counts[category_id] = 0
+            snapshot.category_skus[category_id] = []
+            if parent_id is None:
+                snapshot.main_categories.append(category_id)
+        if sku is not None:
+            snapshot.product_counts[category_id] += 1
+            snapshot.sku_categories[sku] = category_id
+            snapshot.category_skus[category_id].append(sku)
+            # Like Sum(), a category without products has no total at all.
+            snapshot.reorder_totals[category_id] = snapshot.reorder_totals.get(category_id, 0) + reorder_quantity
+    return snapshot
+
+
+def get_catalog_snapshot():
+    snapshot = cache.get(CATALOG_CACHE_KEY)
+    if snapshot is None:
+        snapshot = build_catalog_snapshot()
+        cache.set(CATALOG_CACHE_KEY, snapshot, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+    return snapshot
+
+
+def sample_category_skus(category_id, k, exclude=()):
+    """Up to k distinct random SKUs of a category, without ORDER BY RANDOM().
+
+    random.sample() picks k of the cached SKU list in O(k); a few extra are
+    drawn so that excluded SKUs can be dropped without a second pass.
+    """
+    skus = get_catalog_snapshot().category_skus.get(category_id, [])
+    picked = random.sample(skus, min(len(skus), k + len(exclude)))
+    return [sku for sku in picked if sku not in exclude][:k]
+
+
+def sample_category_products(category_id, k, exclude=()):
+    """Random products of a category in random order, fetched in one query."""
+    skus = sample_category_skus(category_id, k, exclude)
+    products = Product.objects.in_bulk(skus)
+    return [products[sku] for sku in skus if sku in products]
+
+
+def invalidate_catalog_snapshot(**kwargs):
+    cache.delete(CATALOG_CACHE_KEY)
@@ -0,0 +1,156 @@
+"""Price, rating and stock facets for the products page.
+
+The facet index is one GROUP BY over the catalog: product counts per
+(category path, price range, rating band, in stock). It is cached like the
+catalog snapshot and cleared by Product and Category writes, and every
+count the page shows is a sum over its rows, so the number of facets and
+options doesn't add queries. Searches narrow the products in ways the
+index can't know about, so a search page groups its own matches instead;
+that is still a single query.
+"""
+from collections import namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+
+FACET_CACHE_KEY = 'customer_website:facet_index'
+
+# value, lower bound (inclusive), upper bound (exclusive); prices are in SGD.
+PRICE_RANGES = [
+    ('0-25', Decimal('0'), Decimal('25')),
+    ('25-50', Decimal('25'), Decimal('50')),
+    ('50-100', Decimal('50'), Decimal('100')),
+    ('100-250', Decimal('100'), Decimal('250')),
+    ('250-', Decimal('250'), None),
+]
+RATING_BANDS = [
+    ('4-5', 4, None, '4 stars & up'),
+    ('3-4', 3, 4, '3 to 4 stars'),
+    ('2-3', 2, 3, '2 to 3 stars'),
+    ('0-2', 0, 2, 'Under 2 stars'),
+]
+STOCK_OPTIONS = [('1', 'In stock')]
+
+FACETS = ('price', 'rating', 'stock')
+
+FacetOption = namedtuple('FacetOption', 'value label count selected url')
+
+
+def _bounds_q(field, lower, upper):
+    q = Q(**{f'{field}__gte': lower})
+    if upper is not None:
+        q &= Q(**{f'{field}__lt': upper})
+    return q
+
+
+def _bucket(field, bounds):
+    return Case(
+        *[When(_bounds_q(field, lower, upper), then=Value(i)) for i, (lower, upper) in enumerate(bounds)],
+        default=Value(-1),
+        output_field=IntegerField(),
+    )
+
+
+def facet_filters(selected):
+    """Q for each facet with a selection; options within a facet are OR-ed."""
+    filters = {}
+    prices = [(lower, upper) for value, lower, upper in PRICE_RANGES if value in selected.get('price', ())]
+    ratings = [(lower, upper) for value, lower, upper, _ in RATING_BANDS if value in selected.get('rating', ())]
+    if prices:
+        filters['price'] = Q()
+        for lower, upper in prices:
+            filters['price'] |= _bounds_q('unit_price', lower, upper)
+    if ratings:
+        filters['rating'] = Q()
+        for lower, upper in ratings:
+            filters['rating'] |= _bounds_q('product_rating', lower, upper)
+    if '1' in selected.get('stock', ()):
+        filters['stock'] = Q(quantity_on_hand__gt=0)
+    return filters
+
+
+def grouped_counts(queryset):
+    """[(category_path, price index, rating index, in stock, count)] for `queryset`."""
+    rows = queryset.order_by().values_list(
+        'category_path',
+        _bucket('unit_price', [(lower, upper) for _, lower, upper in PRICE_RANGES]),
+        _bucket('product_rating', [(lower, upper) for _, lower, upper, _ in RATING_BANDS]),
+        Case(When(quantity_on_hand__gt=0, then=Value(1)), default=Value(0), output_field=IntegerField()),
+    ).annotate(count=Count('sku'))
+    return [tuple(row) for row in rows]
+
+
+def get_facet_index():
+    from admin_panel.models import Product
+
+    rows = cache.get(FACET_CACHE_KEY)
+    if rows is None:
+        rows = grouped_counts(Product.objects.all())
+        cache.set(FACET_CACHE_KEY, rows, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+    return rows
+
+
+def invalidate_facet_index(**kwargs):
+    cache.delete(FACET_CACHE_KEY)
+
+
+def facet_counts(rows, selected, path=None):
+    """Counts per facet option, each facet counted under the other facets' selections.
+
+    That way choosing one price range still shows how many products the
+    other price ranges would add.
+    """
+    price_selected = {i for i, (value, _, _) in enumerate(PRICE_RANGES) if value in selected.get('price', ())}
+    rating_selected = {i for i, (value, *_) in enumerate(RATING_BANDS) if value in selected.get('rating', ())}
+    stock_selected = '1' in selected.get('stock', ())
+
+    counts = {
+        'price': [0] * len(PRICE_RANGES),
+        'rating': [0] * len(RATING_BANDS),
+        'stock': [0],
+    }
+    for category_path, price, rating, in_stock, count in rows:
+        if path is not None and not (category_path or '').startswith(path):
+            continue
+        price_ok = not price_selected or price in price_selected
+        rating_ok = not rating_selected or rating in rating_selected
+        stock_ok = not stock_selected or in_stock
+        if rating_ok and stock_ok and price >= 0:
+            counts['price'][price] += count
+        if price_ok and stock_ok and rating >= 0:
+            counts['rating'][rating] += count
+        if price_ok and rating_ok and in_stock:
+            counts['stock'][0] += count
+    return counts
+
+
+def facet_options(counts, selected, toggle_url, currency_info):
+    """Template-ready options per facet; toggle_url(facet, value) links to the page with it flipped."""
+    def price_label(lower, upper):
+        symbol, rate = currency_info['symbol'], currency_info['rate']
+        if upper is None:
+            return f"{symbol}{lower * rate:.0f} & up"
+        if not lower:
+            return f"Under {symbol}{upper * rate:.0f}"
+        return f"{symbol}{lower * rate:.0f} to {symbol}{upper * rate:.0f}"
+
+    def option(facet, value, label, count):
+        is_selected = value in selected.get(facet, ())
+        return FacetOption(value, label, count, is_selected, toggle_url(facet, value))
+
+    return {
+        'price': [
+            option('price', value, price_label(lower, upper), count)
+            for (value, lower, upper), count in zip(PRICE_RANGES, counts['price'])
+        ],
+        'rating': [
+            option('rating', value, label, count)
+            for (value, _, _, label), count in zip(RATING_BANDS, counts['rating'])
+        ],
+        'stock': [
+            option('stock', value, label, count)
+            for (value, label), count in zip(STOCK_OPTIONS, counts['stock'])
+        ],
+    }
@@ -0,0 +1,129 @@
+import csv
+import math
+import os
+import warnings
+
+from django.conf import settings
+
+# Columns the preferred-category classifier was trained on, in training order.
+FEATURE_COLUMNS = (
+    'age', 'household_size', 'has_children', 'monthly_income_sgd',
+    'gender_Female', 'gender_Male', 'employment_status_Full-time',
+    'employment_status_Part-time', 'employment_status_Retired',
+    'employment_status_Self-employed', 'employment_status_Student',
+    'occupation_Admin', 'occupation_Education', 'occupation_Sales',
+    'occupation_Service', 'occupation_Skilled Trades', 'occupation_Tech',
+    'education_Bachelor', 'education_Diploma', 'education_Doctorate',
+    'education_Master', 'education_Secondary',
+)
+CATEGORICAL_FIELDS = ('gender', 'employment_status', 'occupation', 'education')
+
+TRAINING_CSV = os.path.join(settings.BASE_DIR, 'admin_panel', 'static', 'admin_panel', 'data', 'b2c_customers_100.csv')
+
+
+class FeatureEncoder:
+    """Maps customer details straight to the classifier's feature vector.
+
+    Numeric fields are copied to their column and each categorical value
+    sets its one-hot column, exactly like the get_dummies() encoding it
+    replaces: missing numeric fields are 0, None is NaN, and unknown or
+    missing categories leave all of their columns at 0.
+    """
+
+    def __init__(self, columns=FEATURE_COLUMNS):
+        self.columns = tuple(columns)
+        self.numeric = []
+        self.one_hot = {}
+        for position, column in enumerate(self.columns):
+            # One-hot columns are named '<field>_<value>', e.g. 'employment_status_Retired'.
+            for categorical in CATEGORICAL_FIELDS:
+                if column.startswith(categorical + '_'):
+                    self.one_hot[categorical, column[len(categorical) + 1:]] = position
+                    break
+            else:
+                self.numeric.append((column, position))
+
+    @classmethod
+    def for_model(cls, model):
+        """An encoder for the columns the model was fitted with, when it recorded them."""
+        columns = getattr(model, 'feature_names_in_', None)
+        return cls(FEATURE_COLUMNS if columns is None else columns)
+
+    def encode(self, customer_data):
+        """Returns a (1, n_features) float64 array."""
+        return self.encode_batch([customer_data])
+
+    def encode_batch(self, rows):
+        """Returns a (len(rows), n_features) float64 array."""
+        import numpy as np
+
+        rows = list(rows)
+        features = np.zeros((len(rows), len(self.columns)), dtype=np.float64)
+        for i, customer_data in enumerate(rows):
+            self._fill(features[i], customer_data)
+        return features
+
+    def _fill(self, vector, customer_data):
+        for field, position in self.numeric:
+            value = customer_data.get(field, 0)
+            vector[position] = math.nan if value is None else float(value)
+        for field in CATEGORICAL_FIELDS:
+            position = self.one_hot.get((field, customer_data.get(field)))
+            if position is not None:
+                vector[position] = 1.0
+
+    def predict(self, model, features):
+        with warnings.catch_warnings():
+            # The model was fitted on a DataFrame; a bare array in the same
+            # column order is what we mean to pass.
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            return model.predict(features)
+
+
+def reference_encode(customer_data):
+    """The original DataFrame encoding, kept to check FeatureEncoder against."""
+    import pandas as pd
+
+    columns = {
+        'age':'int64', 'household_size':'int64', 'has_children':'int64', 'monthly_income_sgd':'float64',
+        'gender_Female':'bool', 'gender_Male':'bool', 'employment_status_Full-time':'bool',
+        'employment_status_Part-time':'bool', 'employment_status_Retired':'bool',
+        'employment_status_Self-employed':'bool', 'employment_status_Student':'bool',
+        'occupation_Admin':'bool', 'occupation_Education':'bool', 'occupation_Sales':'bool',
+        'occupation_Service':'bool', 'occupation_Skilled Trades':'bool', 'occupation_Tech':'bool',
+        'education_Bachelor':'bool', 'education_Diploma':'bool', 'education_Doctorate':'bool',
+        'education_Master':'bool', 'education_Secondary':'bool'
+    }
+
+    df = pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in columns.items()})
+    customer_df = pd.DataFrame([customer_data])
+    customer_encoded = pd.get_dummies(customer_df, columns=['gender', 'employment_status', 'occupation', 'education'])
+
+    for col in df.columns:
+        if col not in customer_encoded.columns:
+            if df[col].dtype == bool:
+                df[col] = False
+            else:
+                df[col] = 0
+        else:
+            df[col] = customer_encoded[col]
+
+    return df
+
+
+def load_training_customers(path=TRAINING_CSV):
+    """The classifier's training rows as feature dicts, with the preferred category dropped."""
+    with open(path, newline='', encoding='utf-8') as f:
+        return [
+            {
+                'age': int(row['age']),
+                'gender': row['gender'],
+                'employment_status': row['employment_status'],
+                'occupation': row['occupation'],
+                'education': row['education'],
+                'household_size': int(row['household_size']),
+                'has_children': int(row['has_children']),
+                'monthly_income_sgd': float(row['monthly_income_sgd']),
+            }
+            for row in csv.DictReader(f)
+        ]
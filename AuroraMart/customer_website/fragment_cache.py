@@ -0,0 +1,90 @@
+"""Cached HTML for product grids.
+
+A fragment is keyed on its name, the inputs it is rendered from and the
+catalog version, a token that Product and Category writes replace. After
+a write every key changes, so no fragment has to be deleted; stale ones
+simply expire. Stock-only saves (checkout's) keep the version unless the
+product sells out or is restocked.
+"""
+import hashlib
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+CATALOG_VERSION_KEY = 'customer_website:catalog_version'
+
+# No fragment shows these. The "In stock" facet picks the products grid's
+# products by quantity_on_hand > 0, so stock saves only keep the version
+# while the product stays on the same side of zero.
+STOCK_FIELDS = {'quantity_on_hand', 'reorder_quantity'}
+
+
+def get_catalog_version():
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version(instance=None, update_fields=None, **kwargs):
+    if (
+        update_fields is not None and set(update_fields) <= STOCK_FIELDS
+        and not instance.stock_status_changed()
+    ):
+        return
+    cache.set(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+class FragmentCache:
+    def __init__(self, timeout=300):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.render_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    def key(self, name, parts):
+        digest = hashlib.sha1(repr((get_catalog_version(), parts)).encode()).hexdigest()
+        return f'customer_website:fragment:{name}:{digest}'
+
+    def get_or_render(self, name, parts, render):
+        key = self.key(name, parts)
+        cached = cache.get(key)
+        if cached is not None:
+            html, seconds = cached
+            with self._lock:
+                self.hits += 1
+                self.saved_seconds += seconds
+            return html
+
+        start = time.perf_counter()
+        html = render()
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self.misses += 1
+            self.render_seconds += seconds
+        if self.timeout > 0:
+            cache.set(key, (html, seconds), self.timeout)
+        return html
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                # Time spent rendering misses, and the render time the hits
+                # would have cost (as measured when each fragment was cached).
+                'render_seconds': round(self.render_seconds, 4),
+                'saved_seconds': round(self.saved_seconds, 4),
+            }
+
+
+fragment_cache = FragmentCache(timeout=getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 300))
+
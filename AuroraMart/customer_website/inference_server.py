@@ -0,0 +1,259 @@
+"""Out-of-process inference over a Unix domain socket.
+
+Frames are a 4-byte big-endian length followed by compact JSON. A request
+frame is a list of calls, ``[[op, args], ...]``, and the reply is a list of
+``[ok, result_or_error]`` pairs in the same order, so a client can send
+several calls in one round trip. Calls from all connections are queued and
+processed in small batches: customer features are encoded and predicted
+with a single predict() call per batch.
+"""
+import errno
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import stat
+import struct
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('>I')
+MAX_FRAME = 16 * 1024 * 1024
+
+
+class InferenceUnavailable(Exception):
+    pass
+
+
+def encode_frame(payload):
+    # Decimal income values are sent as strings; FeatureEncoder float()s them.
+    data = json.dumps(payload, separators=(',', ':'), default=str).encode()
+    return HEADER.pack(len(data)) + data
+
+
+def read_frame(sock):
+    header = _read_exactly(sock, HEADER.size)
+    if header is None:
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > MAX_FRAME:
+        raise ValueError(f"Frame of {length} bytes is too large")
+    data = _read_exactly(sock, length)
+    if data is None:
+        raise ConnectionError("Connection closed in the middle of a frame")
+    return json.loads(data)
+
+
+def _read_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            if chunks:
+                raise ConnectionError("Connection closed in the middle of a frame")
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+class _Call:
+    __slots__ = ('op', 'args', 'ok', 'result', 'done')
+
+    def __init__(self, op, args):
+        self.op = op
+        self.args = args
+        self.ok = False
+        self.result = None
+        self.done = threading.Event()
+
+    def finish(self, ok, result):
+        self.ok = ok
+        self.result = result
+        self.done.set()
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # One connection serves many frames; clients keep it open.
+        while True:
+            try:
+                request = read_frame(self.request)
+            except (ConnectionError, ValueError) as e:
+                logger.warning("Dropping inference connection: %s", e)
+                return
+            if request is None:
+                return
+            calls = [_Call(op, args) for op, args in request]
+            for call in calls:
+                self.server.calls.put(call)
+            # A stuck batch answers with errors rather than holding the client forever.
+            deadline = time.monotonic() + self.server.call_timeout
+            replies = []
+            for call in calls:
+                if call.done.wait(max(0.0, deadline - time.monotonic())):
+                    replies.append([call.ok, call.result])
+                else:
+                    replies.append([False, f"{call.op} timed out after {self.server.call_timeout}s"])
+            self.request.sendall(encode_frame(replies))
+
+
+def remove_stale_socket(path):
+    """Removes the socket file a crashed server left at `path`.
+
+    Raises OSError if `path` is something other than a socket, or if a
+    server is still listening on it.
+    """
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise OSError(errno.EEXIST, f"{path} exists and is not a socket")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        pass
+    else:
+        raise OSError(errno.EADDRINUSE, f"An inference server is already listening on {path}")
+    finally:
+        probe.close()
+    os.remove(path)
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves 'predict' and 'recommend' calls from the in-process model registry."""
+
+    daemon_threads = True
+
+    def __init__(self, path, batch_window=0.002, max_batch=64, call_timeout=5.0):
+        remove_stale_socket(path)
+        super().__init__(path, _Handler)
+        self.calls = queue.Queue()
+        self.call_timeout = call_timeout
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.processed = 0
+        threading.Thread(target=self._process_batches, name='inference-batcher', daemon=True).start()
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+    def _process_batches(self):
+        while True:
+            batch = [self.calls.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.calls.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._process(batch)
+            self.batches += 1
+            self.processed += len(batch)
+
+    def _process(self, batch):
+        from .views import get_feature_encoder, get_preferred_model, local_recommendations
+
+        predictions = [call for call in batch if call.op == 'predict']
+        if predictions:
+            try:
+                model = get_preferred_model()
+                if model is None:
+                    results = [[] for _ in predictions]
+                else:
+                    encoder = get_feature_encoder(model)
+                    features = encoder.encode_batch(call.args['customer'] for call in predictions)
+                    results = [[str(category)] for category in encoder.predict(model, features)]
+                for call, result in zip(predictions, results):
+                    call.finish(True, result)
+            except Exception as e:
+                logger.exception("Batched prediction failed")
+                for call in predictions:
+                    call.finish(False, str(e))
+
+        for call in batch:
+            if call.op == 'predict':
+                continue
+            try:
+                if call.op != 'recommend':
+                    raise ValueError(f"Unknown operation {call.op!r}")
+                call.finish(True, local_recommendations(**call.args))
+            except Exception as e:
+                logger.exception("Inference call %s failed", call.op)
+                call.finish(False, str(e))
+
+
+class InferenceClient:
+    """Client for InferenceServer that keeps one connection per thread.
+
+    Any failure raises InferenceUnavailable so callers can fall back to the
+    in-process path; after a failure the server is not tried again for
+    `retry_after` seconds, so a missing sidecar doesn't cost every request
+    a connection attempt.
+    """
+
+    def __init__(self, path, timeout=0.5, retry_after=5.0):
+        self.path = path
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._local = threading.local()
+        self._down_until = 0.0
+
+    def predict(self, customer_data):
+        return self.call([('predict', {'customer': customer_data})])[0]
+
+    def recommend(self, items, metric='confidence', top_n=5):
+        return self.call([('recommend', {'items': list(items), 'metric': metric, 'top_n': top_n})])[0]
+
+    def call(self, calls):
+        if time.monotonic() < self._down_until:
+            raise InferenceUnavailable("Inference server marked down")
+        try:
+            sock = self._connection()
+            sock.sendall(encode_frame([[op, args] for op, args in calls]))
+            replies = read_frame(sock)
+            if replies is None:
+                raise ConnectionError("Inference server closed the connection")
+        except (OSError, ValueError) as e:
+            self._disconnect()
+            self._down_until = time.monotonic() + self.retry_after
+            logger.warning("Inference server at %s unavailable (%s); using in-process models", self.path, e)
+            raise InferenceUnavailable(str(e)) from e
+
+        results = []
+        for ok, result in replies:
+            if not ok:
+                raise InferenceUnavailable(result)
+            results.append(result)
+        return results
+
+    def _connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _disconnect(self):
+        sock = getattr(self._local, 'sock', None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
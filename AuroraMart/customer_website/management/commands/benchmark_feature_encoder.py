@@ -0,0 +1,74 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customer_website.feature_encoding import FeatureEncoder, load_training_customers, reference_encode
+from customer_website.models import Customer
+
+
+def sample_customers(count, seed):
+    """Training rows plus form-shaped variations: Decimal income, blank choices, no has_children."""
+    rng = random.Random(seed)
+    choices = {
+        'gender': [value for value, _ in Customer.GENDER_CHOICES] + [None],
+        'employment_status': [value for value, _ in Customer.EMPLOYMENT_CHOICES] + [None],
+        'occupation': [value for value, _ in Customer.OCCUPATION_CHOICES] + [None],
+        'education': [value for value, _ in Customer.EDUCATION_CHOICES] + [None],
+    }
+    customers = load_training_customers()
+    while len(customers) < count:
+        customer = {field: rng.choice(values) for field, values in choices.items()}
+        customer.update({
+            'age': rng.randint(18, 80),
+            'household_size': rng.randint(1, 7),
+            'number_of_children': rng.randint(0, 4),
+            'monthly_income_sgd': Decimal(rng.randint(100000, 2000000)) / 100,
+        })
+        customers.append(customer)
+    return customers[:count]
+
+
+class Command(BaseCommand):
+    help = "Check FeatureEncoder against the get_dummies() encoding and time both."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        from customer_website.views import get_preferred_model
+
+        model = get_preferred_model()
+        if model is None:
+            raise CommandError("The preferred-category classifier could not be loaded")
+        encoder = FeatureEncoder.for_model(model)
+        customers = sample_customers(options['customers'], options['seed'])
+
+        mismatches = 0
+        for customer in customers:
+            expected = reference_encode(customer)
+            features = encoder.encode(customer)
+            same_features = (expected.to_numpy(dtype='float64') == features).all()
+            same_prediction = (model.predict(expected) == encoder.predict(model, features)).all()
+            if not (same_features and same_prediction):
+                mismatches += 1
+                self.stderr.write(f"Mismatch for {customer}")
+        if mismatches:
+            raise CommandError(f"{mismatches}/{len(customers)} customers encode differently")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(customers)} customers: identical features and predictions"
+        ))
+
+        timings = [
+            ('get_dummies + predict', lambda: [model.predict(reference_encode(c)) for c in customers]),
+            ('FeatureEncoder + predict', lambda: [encoder.predict(model, encoder.encode(c)) for c in customers]),
+            ('FeatureEncoder.encode only', lambda: [encoder.encode(c) for c in customers]),
+            ('encode_batch + one predict', lambda: encoder.predict(model, encoder.encode_batch(customers))),
+        ]
+        for label, run in timings:
+            start = time.perf_counter()
+            run()
+            per_customer = (time.perf_counter() - start) / len(customers) * 1e6
+            self.stdout.write(f"{label:<30}{per_customer:>10.1f} us per customer")
@@ -0,0 +1,104 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from admin_panel.models import Category, Product
+from customer_website.product_search import fts_available, index_products, ranked_skus, search_products
+
+
+
+def vocabulary(rng, count, syllables):
+    """Pronounceable made-up words, so that the catalog has a realistic number of distinct terms."""
+    def word():
+        return ''.join(rng.choice('bcdfghklmnprstvz') + rng.choice('aeiou') for _ in range(rng.choice(syllables)))
+    return sorted({word() for _ in range(count)})
+
+
+class Command(BaseCommand):
+    help = (
+        "Time product_name__icontains against the FTS5 index on a synthetic catalog. "
+        "The products are inserted in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per query (default: 5)")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError("The FTS5 product index needs SQLite")
+        categories = list(Category.objects.all()) or [None]
+        rng = random.Random(options['seed'])
+        words = {
+            'brands': vocabulary(rng, 2000, (2, 3)),
+            'nouns': vocabulary(rng, 800, (2, 3, 4)),
+            'adjectives': vocabulary(rng, 150, (3,)),
+        }
+        # Short prefixes (first keystrokes), whole words and two-word queries.
+        queries = [
+            words['brands'][0][:2], words['nouns'][1][:3], words['brands'][2][:4], words['adjectives'][3],
+            words['nouns'][4], f"{words['brands'][5]} {words['nouns'][6][:3]}", 'zzzz',
+        ]
+
+        with transaction.atomic():
+            start = time.perf_counter()
+            self._populate(options['products'], categories, words, rng)
+            self.stdout.write(
+                f"Inserted {options['products']} products (and their FTS rows) in {time.perf_counter() - start:.1f}s"
+            )
+            self.stdout.write(f"{'query':<20}{'LIKE ms':>10}{'rows':>8}{'FTS ms':>10}{'rows':>8}{'top-20 ms':>11}{'speedup':>9}")
+            for query in queries:
+                like_ms, like_rows = self._time(
+                    lambda: list(Product.objects.filter(product_name__icontains=query).values_list('sku', flat=True)),
+                    options['repeat'],
+                )
+                fts_ms, fts_rows = self._time(
+                    lambda: list(search_products(Product.objects.all(), query).values_list('sku', flat=True)),
+                    options['repeat'],
+                )
+                top_ms, _ = self._time(lambda: ranked_skus(query, limit=20), options['repeat'])
+                self.stdout.write(
+                    f"{query:<20}{like_ms:>10.2f}{like_rows:>8}{fts_ms:>10.2f}{fts_rows:>8}{top_ms:>11.2f}"
+                    f"{like_ms / fts_ms if fts_ms else 0:>8.1f}x"
+                )
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS("Rolled back the synthetic products"))
+
+    def _populate(self, count, categories, words, rng):
+        batch = []
+        for i in range(count):
+            brand, noun = rng.choice(words['brands']).capitalize(), rng.choice(words['nouns'])
+            category = rng.choice(categories)
+            product = Product(
+                sku=f'BENCH-{i:07d}',
+                product_name=f"{brand} {rng.choice(words['adjectives'])} {noun}",
+                description=f"A {rng.choice(words['adjectives'])} {noun} from {brand}, "
+                            f"pairs well with a {rng.choice(words['nouns'])}. Model {rng.randint(100, 999)}.",
+                unit_price=Decimal(rng.randint(100, 100000)) / 100,
+                product_rating=round(rng.uniform(1, 5), 1),
+                category=category,
+            )
+            # bulk_create() skips Product.save() and the signals that index the product.
+            product.category_path = product.build_category_path()
+            batch.append(product)
+            if len(batch) == 5000:
+                self._insert(batch)
+                batch = []
+        self._insert(batch)
+
+    def _insert(self, batch):
+        Product.objects.bulk_create(batch)
+        index_products(product.sku for product in batch)
+
+    def _time(self, run, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1000, len(rows)
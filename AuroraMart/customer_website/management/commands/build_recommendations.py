@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from admin_panel.models import Product
+from customer_website.models import ProductRecommendation
+
+
+class Command(BaseCommand):
+    help = "Precompute per-SKU 'Frequently Bought Together' rows from the association rules."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--metric', action='append', dest='metrics',
+                            help="Rule metric to rank by (repeatable, default: FREQUENTLY_BOUGHT_TOGETHER_METRIC)")
+        parser.add_argument('--top-n', type=int, default=4,
+                            help="Recommendations stored per SKU (default: 4)")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        from customer_website.views import model_registry
+
+        # One lookup, so that the rows are stamped with the version they were computed from.
+        loaded = model_registry.get_loaded('rules')
+        rule_store, rules_version = loaded.value, loaded.version
+        metrics = options['metrics'] or [getattr(settings, 'FREQUENTLY_BOUGHT_TOGETHER_METRIC', 'confidence')]
+        top_n = options['top_n']
+        for metric in metrics:
+            if metric not in rule_store.metrics:
+                raise CommandError(f"Unknown rule metric '{metric}'")
+
+        start = time.perf_counter()
+        product_skus = set(Product.objects.values_list('sku', flat=True))
+        source_skus = sorted(rule_store.antecedent_skus() & product_skus)
+
+        rows = []
+        for metric in metrics:
+            for sku in source_skus:
+                scored = rule_store.scored_recommendations([sku], metric=metric, top_n=top_n)
+                scored = [(rec_sku, score) for rec_sku, score in scored if rec_sku in product_skus]
+                for rank, (rec_sku, score) in enumerate(scored):
+                    rows.append(ProductRecommendation(
+                        sku=sku,
+                        rank=rank,
+                        recommended_product_id=rec_sku,
+                        metric=metric,
+                        score=score,
+                        rules_version=rules_version,
+                    ))
+
+        with transaction.atomic():
+            ProductRecommendation.objects.filter(metric__in=metrics).delete()
+            ProductRecommendation.objects.bulk_create(rows, batch_size=options['batch_size'])
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {len(rows)} recommendations for {len(source_skus)} SKUs "
+            f"({', '.join(metrics)}, rules {rules_version}) in {elapsed:.2f}s"
+        ))
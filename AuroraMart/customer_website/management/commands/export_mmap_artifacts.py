@@ -0,0 +1,39 @@
+import os
+import shutil
+
+from django.core.management.base import BaseCommand
+
+from customer_website.recommendations import export_rule_store, load_rule_store
+from customer_website.rule_mining import dump_atomic
+
+
+class Command(BaseCommand):
+    help = "Write memory-mappable copies of the prediction_data artifacts for ML_MMAP_ARTIFACTS."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=2,
+                            help="Rule exports to keep, including the new one (default: 2)")
+
+    def handle(self, *args, **options):
+        import joblib
+
+        from customer_website.views import loaded_path, mmap_dir, model_path
+
+        os.makedirs(mmap_dir, exist_ok=True)
+
+        # An uncompressed dump is what lets joblib.load(mmap_mode='r') map the
+        # estimator's arrays instead of copying them.
+        classifier_path = os.path.join(mmap_dir, 'classifier.joblib')
+        dump_atomic(joblib.load(model_path), classifier_path)
+        self.stdout.write(f"Classifier -> {classifier_path}")
+
+        pointer = export_rule_store(load_rule_store(loaded_path), mmap_dir)
+        self.stdout.write(f"Rules -> {pointer}")
+
+        # Older exports may still be mapped by running workers until they
+        # reload, so only the oldest ones are removed.
+        exports = sorted(name for name in os.listdir(mmap_dir) if name.startswith('rules-'))
+        for name in exports[:-options['keep']] if options['keep'] > 0 else []:
+            shutil.rmtree(os.path.join(mmap_dir, name))
+
+        self.stdout.write(self.style.SUCCESS("Set ML_MMAP_ARTIFACTS = True to serve these files"))
@@ -0,0 +1,64 @@
+import random
+import warnings
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customer_website.feature_encoding import FeatureEncoder, load_training_customers
+from customer_website.model_registry import load_joblib
+from customer_website.numpy_predictor import NumpyClassifier, UnsupportedModel, export_classifier
+
+
+class Command(BaseCommand):
+    help = "Export the preferred-category classifier to plain NumPy arrays and check its predictions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Where to write the .npz file (default: the path ML_NUMPY_CLASSIFIER serves)")
+        parser.add_argument('--random-rows', type=int, default=1000,
+                            help="Random feature vectors to compare on top of the training CSV (default: 1000)")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        import numpy as np
+
+        from customer_website.views import model_path, numpy_model_path
+
+        model = load_joblib(model_path)
+        output = options['output'] or numpy_model_path
+        try:
+            export_classifier(model, output)
+        except UnsupportedModel as e:
+            raise CommandError(str(e))
+        exported = NumpyClassifier.load(output)
+
+        encoder = FeatureEncoder.for_model(model)
+        training = encoder.encode_batch(load_training_customers())
+        rng = random.Random(options['seed'])
+        random_rows = encoder.encode_batch(
+            {
+                'age': rng.randint(18, 80),
+                'household_size': rng.randint(1, 7),
+                'has_children': rng.randint(0, 1),
+                'monthly_income_sgd': rng.uniform(500, 30000),
+                'gender': rng.choice(['Male', 'Female']),
+                'employment_status': rng.choice(['Full-time', 'Part-time', 'Self-employed', 'Student', 'Retired']),
+                'occupation': rng.choice(['Admin', 'Education', 'Sales', 'Service', 'Skilled Trades', 'Tech']),
+                'education': rng.choice(['Secondary', 'Diploma', 'Bachelor', 'Master', 'Doctorate']),
+            }
+            for _ in range(options['random_rows'])
+        )
+
+        for label, features in (('training CSV', training), ('random', random_rows)):
+            expected = encoder.predict(model, features)
+            actual = exported.predict(features)
+            mismatches = int((expected != actual).sum())
+            if mismatches:
+                raise CommandError(f"{mismatches}/{len(features)} {label} predictions differ from {type(model).__name__}")
+            if hasattr(model, 'predict_proba') and exported.kind == 'trees':
+                with warnings.catch_warnings():
+                    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+                    expected_proba = model.predict_proba(features)
+                if not np.array_equal(expected_proba, exported.predict_proba(features)):
+                    raise CommandError(f"{label} probabilities differ from {type(model).__name__}")
+            self.stdout.write(f"{len(features)} {label} rows: predictions match")
+
+        self.stdout.write(self.style.SUCCESS(f"Exported {type(model).__name__} to {output}"))
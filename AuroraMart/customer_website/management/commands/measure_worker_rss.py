@@ -0,0 +1,99 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+WORKER_SCRIPT = '''
+import os, sys
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'AuroraMart.settings')
+import django
+django.setup()
+from django.conf import settings
+settings.ML_MMAP_ARTIFACTS = {mmap}
+from customer_website import views
+# Import the libraries up front so the baseline leaves only the artifacts to measure.
+import joblib, numpy, pandas, sklearn
+print('setup', flush=True)
+sys.stdin.readline()
+views.warm_up_models()
+# Touch every page of the rules the way serving traffic eventually does.
+store = views.get_rule_store()
+store.recommend_batch([[sku] for sku in store.antecedent_skus()])
+views.predict_preferred_category({{
+    'age': 30, 'household_size': 2, 'has_children': 1, 'monthly_income_sgd': 5000,
+    'gender': 'Female', 'employment_status': 'Full-time', 'occupation': 'Sales', 'education': 'Bachelor',
+}})
+print('ready', flush=True)
+sys.stdin.readline()
+'''
+
+
+def memory_kib(pid):
+    """Rss and Pss of a process in KiB, from /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                values[key] = int(rest.split()[0])
+    return values
+
+
+class Command(BaseCommand):
+    help = "Report the memory each worker spends on the ML artifacts, with and without ML_MMAP_ARTIFACTS."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Worker processes per mode (default: 4)")
+
+    def handle(self, *args, **options):
+        if not os.path.exists('/proc/self/smaps_rollup'):
+            raise CommandError("This measurement needs Linux /proc/<pid>/smaps_rollup")
+        from customer_website.views import mmap_dir
+        if not os.path.exists(os.path.join(mmap_dir, 'rules.json')):
+            raise CommandError("No memory-mapped artifacts found; run `manage.py export_mmap_artifacts` first")
+
+        self.stdout.write(
+            "RSS counts shared pages in full for every process; PSS splits them between the "
+            "processes sharing them, so the PSS total is what the host actually pays."
+        )
+        for label, mmap in (('joblib (private copies)', False), ('memory-mapped', True)):
+            before, after = self._measure(options['workers'], mmap)
+            rss = [a['Rss'] - b['Rss'] for a, b in zip(after, before)]
+            pss = [a['Pss'] - b['Pss'] for a, b in zip(after, before)]
+            self.stdout.write(self.style.SUCCESS(f"{label}, {len(after)} workers:"))
+            self.stdout.write(f"    artifacts RSS per worker {sum(rss) / len(rss) / 1024:8.1f} MiB")
+            self.stdout.write(f"    artifacts PSS per worker {sum(pss) / len(pss) / 1024:8.1f} MiB")
+            self.stdout.write(f"    artifacts PSS total      {sum(pss) / 1024:8.1f} MiB")
+            self.stdout.write(f"    worker PSS total         {sum(a['Pss'] for a in after) / 1024:8.1f} MiB")
+
+    def _measure(self, workers, mmap):
+        script = WORKER_SCRIPT.format(mmap=mmap)
+        processes = [
+            subprocess.Popen(
+                [sys.executable, '-c', script], cwd=settings.BASE_DIR,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+            )
+            for _ in range(workers)
+        ]
+        try:
+            # Baseline once Django is set up, then load the artifacts in every
+            # worker before measuring so shared pages are split between them all.
+            before = [self._wait_for(process, 'setup') for process in processes]
+            for process in processes:
+                process.stdin.write('\n')
+                process.stdin.flush()
+            for process in processes:
+                self._wait_for(process, 'ready')
+            after = [memory_kib(process.pid) for process in processes]
+        finally:
+            for process in processes:
+                process.kill()
+                process.wait()
+        return before, after
+
+    def _wait_for(self, process, marker):
+        if process.stdout.readline().strip() != marker:
+            raise CommandError(f"Worker {process.pid} failed before reporting '{marker}'")
+        return memory_kib(process.pid)
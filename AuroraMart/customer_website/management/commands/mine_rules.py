@@ -0,0 +1,64 @@
+import os
+import time
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from customer_website.rule_mining import SupportCounts, completed_order_baskets, dump_atomic, load_counts
+
+PREDICTION_DATA = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..', 'prediction_data'))
+
+
+class Command(BaseCommand):
+    help = "Mine association rules from completed orders, counting only orders placed since earlier runs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--state', default=os.path.join(PREDICTION_DATA, 'rule_mining_state.joblib'),
+                            help="Support counts kept between runs")
+        parser.add_argument('--output', default=os.path.join(PREDICTION_DATA, 'mined_rules.joblib'),
+                            help="Where to write the rules artifact")
+        parser.add_argument('--install', action='store_true',
+                            help="Replace the rules artifact the site serves (picked up by the model registry)")
+        parser.add_argument('--rebuild', action='store_true', help="Ignore the saved counts and recount every order")
+        parser.add_argument('--min-support', type=float, default=0.0,
+                            help="Minimum pair support as a fraction of orders (default: 0)")
+        parser.add_argument('--min-confidence', type=float, default=0.0)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--lookback-days', type=int, default=30,
+                            help="Reread orders placed this long before the last one counted, to catch orders "
+                                 "completed since (default: 30)")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        counts = SupportCounts() if options['rebuild'] else load_counts(options['state'])
+
+        lookback = timedelta(days=options['lookback_days'])
+        new_orders = 0
+        baskets = completed_order_baskets(since=counts.window_start(lookback), chunk_size=options['chunk_size'])
+        for order_id, order_date, skus in baskets:
+            new_orders += counts.add(order_id, order_date, skus)
+        counts.prune(lookback)
+        counted = time.perf_counter()
+
+        if not counts.transactions:
+            raise CommandError("There are no completed orders to mine rules from")
+
+        rules = counts.rules(min_support=options['min_support'], min_confidence=options['min_confidence'])
+        if options['install']:
+            from customer_website.views import loaded_path
+            output = loaded_path
+        else:
+            output = options['output']
+        dump_atomic(rules, output)
+        # Save the counts only once the rules built from them are written.
+        dump_atomic(counts, options['state'])
+        done = time.perf_counter()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Counted {new_orders} new orders ({counts.transactions} in total) in {counted - start:.2f}s; "
+            f"wrote {len(rules)} rules to {output} in {done - counted:.2f}s"
+        ))
+        if options['install']:
+            # Until then product pages fall back to the live rules.
+            call_command('build_recommendations', stdout=self.stdout, stderr=self.stderr)
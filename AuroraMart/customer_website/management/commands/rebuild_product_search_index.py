@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from admin_panel.models import Product
+from customer_website.product_search import fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the full-text product search index from the product table, "
+        "after writes that skip model signals (bulk_create(), update(), raw SQL)."
+    )
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError("The FTS5 product index needs SQLite")
+        start = time.perf_counter()
+        with transaction.atomic():
+            rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {Product.objects.count()} products in {time.perf_counter() - start:.1f}s"
+        ))
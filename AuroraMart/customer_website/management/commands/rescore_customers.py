@@ -0,0 +1,114 @@
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from customer_website.models import Customer
+
+# The same fields new_userview passes to predict_preferred_category.
+FEATURE_FIELDS = (
+    'age', 'gender', 'employment_status', 'occupation', 'education',
+    'household_size', 'number_of_children', 'monthly_income_sgd',
+)
+
+_worker_model = None
+
+
+def _init_worker():
+    global _worker_model
+    import django
+    django.setup()
+    from customer_website.views import get_preferred_model
+    _worker_model = get_preferred_model()
+
+
+def predict_categories(model, rows):
+    """Preferred category for each feature dict, from one batched predict() call."""
+    from customer_website.views import get_feature_encoder
+
+    if not rows:
+        return []
+    encoder = get_feature_encoder(model)
+    return [str(category) for category in encoder.predict(model, encoder.encode_batch(rows))]
+
+
+def _predict_in_worker(rows):
+    return predict_categories(_worker_model, rows)
+
+
+class Command(BaseCommand):
+    help = "Recompute Customer.preferred_category for every customer with the current classifier."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help="Customers read, predicted and written per batch (default: 1000)")
+        parser.add_argument('--workers', type=int, default=0,
+                            help="Predict chunks in this many processes (default: 0, in this process)")
+        parser.add_argument('--dry-run', action='store_true', help="Count changes without saving them")
+
+    def handle(self, *args, **options):
+        from customer_website.views import get_preferred_model
+
+        model = get_preferred_model()
+        if model is None:
+            raise CommandError("The preferred-category classifier could not be loaded")
+
+        start = time.perf_counter()
+        chunks = self._chunks(options['chunk_size'])
+        if options['workers'] > 0:
+            # Forked workers must not share this process's database connection.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as pool:
+                # Workers only predict; writes stay in this process so SQLite
+                # never sees concurrent writers. A couple of chunks per worker
+                # are kept in flight so memory stays bounded.
+                totals = []
+                pending = deque()
+                for customers, rows in chunks:
+                    pending.append((customers, pool.submit(_predict_in_worker, rows)))
+                    if len(pending) >= options['workers'] * 2:
+                        customers, future = pending.popleft()
+                        totals.append(self._save(customers, future.result(), options['dry_run']))
+                for customers, future in pending:
+                    totals.append(self._save(customers, future.result(), options['dry_run']))
+        else:
+            totals = [
+                self._save(customers, predict_categories(model, rows), options['dry_run'])
+                for customers, rows in chunks
+            ]
+
+        elapsed = time.perf_counter() - start
+        rows = sum(count for count, _ in totals)
+        changed = sum(count for _, count in totals)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rescored {rows} customers in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:.0f} rows/s); "
+            f"{changed} preferred categories {'would change' if options['dry_run'] else 'changed'}"
+        ))
+
+    def _chunks(self, chunk_size):
+        # Keyset pages, each fetched in full: _save() writes the customer
+        # table between pages, which SQLite must not do under an open cursor.
+        customers = Customer.objects.only('customer_id', 'preferred_category', *FEATURE_FIELDS).order_by('customer_id')
+        last_id = None
+        while True:
+            page = customers if last_id is None else customers.filter(customer_id__gt=last_id)
+            chunk = list(page[:chunk_size])
+            if not chunk:
+                return
+            last_id = chunk[-1].customer_id
+            yield chunk, [self._features(customer) for customer in chunk]
+
+    def _features(self, customer):
+        return {field: getattr(customer, field) for field in FEATURE_FIELDS}
+
+    def _save(self, customers, categories, dry_run):
+        changed = []
+        for customer, category in zip(customers, categories):
+            if customer.preferred_category != category:
+                customer.preferred_category = category
+                changed.append(customer)
+        if changed and not dry_run:
+            Customer.objects.bulk_update(changed, ['preferred_category'])
+        return len(customers), len(changed)
@@ -0,0 +1,83 @@
+import random
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customer_website.recommendations import CompactRuleStore, reference_candidates
+
+
+def dataframe_nbytes(rules):
+    """Deep size of the rules DataFrame, counting each frozenset and SKU string once."""
+    total = int(rules.memory_usage(index=True, deep=False).sum())
+    seen = set()
+    for column in ('antecedents', 'consequents'):
+        for itemset in rules[column]:
+            if id(itemset) not in seen:
+                seen.add(id(itemset))
+                total += sys.getsizeof(itemset)
+            for sku in itemset:
+                if id(sku) not in seen:
+                    seen.add(id(sku))
+                    total += sys.getsizeof(sku)
+    return total
+
+
+def store_nbytes(store):
+    """Array bytes plus the per-process SKU vocabulary (list and id lookup dict)."""
+    vocabulary = sys.getsizeof(store.skus) + sys.getsizeof(store.sku_ids)
+    vocabulary += sum(sys.getsizeof(sku) for sku in store.skus)
+    return store.nbytes + vocabulary
+
+
+class Command(BaseCommand):
+    help = "Compare the memory used by the rules DataFrame and by CompactRuleStore."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help="Rules artifact (default: the one the site serves)")
+        parser.add_argument('--verify', type=int, default=200, metavar='N',
+                            help="Check N random baskets against the DataFrame implementation (default: 200)")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        import joblib
+
+        from customer_website.views import loaded_path
+
+        path = options['path'] or loaded_path
+        rules = joblib.load(path)
+
+        start = time.perf_counter()
+        store = CompactRuleStore(rules)
+        build_time = time.perf_counter() - start
+
+        df_bytes = dataframe_nbytes(rules)
+        compact_bytes = store_nbytes(store)
+        self.stdout.write(f"Rules: {len(store)}  SKUs: {len(store.skus)}  ({path})")
+        self.stdout.write(f"{'DataFrame (frozensets, float64)':<36}{df_bytes / 1024 ** 2:>10.2f} MiB")
+        self.stdout.write(f"{'CompactRuleStore (CSR, float32)':<36}{compact_bytes / 1024 ** 2:>10.2f} MiB")
+        self.stdout.write(f"{'Reduction':<36}{df_bytes / compact_bytes:>10.1f}x")
+        self.stdout.write(f"{'Store build time':<36}{build_time:>10.2f} s")
+
+        if options['verify'] <= 0:
+            return
+
+        rng = random.Random(options['seed'])
+        skus = sorted(store.antecedent_skus())
+        mismatches = 0
+        for _ in range(options['verify']):
+            basket = rng.sample(skus, min(len(skus), rng.choice([1, 1, 2, 3, 5])))
+            for metric in ('confidence', 'lift'):
+                top_n = rng.choice([1, 4, 5])
+                expected = reference_candidates(rules, basket, metric=metric, top_n=top_n)
+                recommended = store.recommend(basket, metric=metric, top_n=top_n)
+                if (store.candidates(basket, metric=metric, top_n=top_n) != expected
+                        or len(recommended) != min(top_n, len(expected))
+                        or not expected.issuperset(recommended)):
+                    mismatches += 1
+                    self.stderr.write(f"Mismatch for {basket} ({metric}, top_n={top_n})")
+
+        checked = options['verify'] * 2
+        if mismatches:
+            raise CommandError(f"{mismatches}/{checked} recommendation lists differ from the DataFrame implementation")
+        self.stdout.write(self.style.SUCCESS(f"{checked} recommendation lists match the DataFrame implementation"))
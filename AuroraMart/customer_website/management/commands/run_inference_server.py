@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from customer_website.inference_server import InferenceServer
+
+
+class Command(BaseCommand):
+    help = "Serve preferred-category predictions and recommendations to the web workers over a Unix socket."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=getattr(settings, 'INFERENCE_SOCKET', None) or '/tmp/auroramart-inference.sock')
+        parser.add_argument('--batch-window', type=float, default=2.0,
+                            help="Milliseconds to wait for more calls to batch with the first one (default: 2)")
+        parser.add_argument('--max-batch', type=int, default=64)
+        parser.add_argument('--call-timeout', type=float, default=5.0,
+                            help="Seconds a client waits for its calls before getting an error back (default: 5)")
+
+    def handle(self, *args, **options):
+        from customer_website.views import warm_up_models
+
+        warm_up_models()
+        try:
+            server = InferenceServer(
+                options['socket'], batch_window=options['batch_window'] / 1000, max_batch=options['max_batch'],
+                call_timeout=options['call_timeout'],
+            )
+        except OSError as e:
+            raise CommandError(str(e)) from e
+        self.stdout.write(self.style.SUCCESS(f"Inference server listening on {options['socket']}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Served {server.processed} calls in {server.batches} batches")
@@ -0,0 +1,81 @@
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+FIRST_REQUEST_SCRIPT = '''
+import json, os, sys, time
+start = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'AuroraMart.settings')
+import django
+django.setup()
+from django.test import Client
+setup_done = time.perf_counter()
+if {warm_up}:
+    from customer_website.views import warm_up_models
+    warm_up_models()
+warm_done = time.perf_counter()
+response = Client(HTTP_HOST='localhost').get('/login/')
+done = time.perf_counter()
+print(json.dumps({{
+    'status': response.status_code,
+    'setup': setup_done - start,
+    'warm_up': warm_done - setup_done,
+    'request': done - warm_done,
+    'ml_modules': sorted(m for m in ('joblib', 'numpy', 'pandas', 'sklearn') if m in sys.modules),
+}}))
+'''
+
+
+class Command(BaseCommand):
+    help = "Measure cold-start time of `manage.py check` and of the first request to the login page."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters per measurement (default: 5)")
+        parser.add_argument('--warm-up', action='store_true',
+                            help="Also measure a worker that calls warm_up_models() before its first request")
+
+    def handle(self, *args, **options):
+        runs = options['runs']
+
+        check_times = [self._run([sys.executable, 'manage.py', 'check'])[0] for _ in range(runs)]
+        self._report("manage.py check", check_times)
+
+        scenarios = [('first request to /login/', False)]
+        if options['warm_up']:
+            scenarios.append(('first request to /login/ after warm-up', True))
+
+        for label, warm_up in scenarios:
+            script = FIRST_REQUEST_SCRIPT.format(warm_up=warm_up)
+            results = []
+            for _ in range(runs):
+                wall, output = self._run([sys.executable, '-c', script])
+                result = json.loads(output.strip().splitlines()[-1])
+                if result['status'] != 200:
+                    raise CommandError(f"/login/ returned HTTP {result['status']}")
+                result['wall'] = wall
+                results.append(result)
+            self._report(label, [r['wall'] for r in results])
+            for key in ('setup', 'warm_up', 'request'):
+                values = [r[key] * 1000 for r in results]
+                self.stdout.write(f"    {key:<8} median {statistics.median(values):8.1f} ms")
+            self.stdout.write(f"    ML modules imported: {', '.join(results[-1]['ml_modules']) or 'none'}")
+
+    def _run(self, command):
+        start = time.perf_counter()
+        completed = subprocess.run(command, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if completed.returncode != 0:
+            raise CommandError(f"{' '.join(command[:3])} failed:\n{completed.stderr}")
+        return elapsed, completed.stdout
+
+    def _report(self, label, times):
+        times_ms = [t * 1000 for t in times]
+        self.stdout.write(self.style.SUCCESS(
+            f"{label}: median {statistics.median(times_ms):.1f} ms, "
+            f"min {min(times_ms):.1f} ms, max {max(times_ms):.1f} ms over {len(times_ms)} runs"
+        ))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_panel', '0017_coupon_assigned_customers'),
+        ('customer_website', '0012_wishlist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRecommendation',
+            fields=[
+                ('recommendation_id', models.AutoField(primary_key=True, serialize=False)),
+                ('sku', models.CharField(max_length=50)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('metric', models.CharField(default='confidence', max_length=20)),
+                ('score', models.FloatField()),
+                ('recommended_product', models.ForeignKey(db_column='recommended_sku', on_delete=django.db.models.deletion.CASCADE, related_name='recommended_with', to='admin_panel.product')),
+            ],
+            options={
+                'ordering': ['sku', 'metric', 'rank'],
+                'unique_together': {('sku', 'metric', 'rank')},
+            },
+        ),
+    ]
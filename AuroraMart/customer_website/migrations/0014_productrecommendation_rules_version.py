@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_website', '0013_productrecommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productrecommendation',
+            name='rules_version',
+            field=models.CharField(default='', max_length=12),
+        ),
+    ]
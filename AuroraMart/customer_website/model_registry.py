@@ -0,0 +1,203 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactUnavailable(Exception):
+    pass
+
+
+def load_joblib(path):
+    # joblib pulls in numpy (and unpickling pulls in pandas/sklearn), so only
+    # import it once an artifact is actually needed.
+    import joblib
+    return joblib.load(path)
+
+
+def load_joblib_mmap(path):
+    # Large NumPy arrays in an uncompressed dump come back as read-only
+    # memory maps that all workers share through the page cache.
+    import joblib
+    return joblib.load(path, mmap_mode='r')
+
+
+def file_checksum(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True)
+class LoadedArtifact:
+    value: Any
+    version: str
+    checksum: str
+    mtime: float
+    size: int
+    loaded_at: float
+
+
+@dataclass
+class Artifact:
+    name: str
+    path: str
+    loader: Callable[[str], Any]
+    current: LoadedArtifact = None
+    loading: bool = False
+    last_checked: float = 0.0
+    last_error: str = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class ModelRegistry:
+    """Thread-safe holder for the prediction_data artifacts.
+
+    Readers always get the currently loaded version without waiting. Every
+    ``check_interval`` seconds a read also stats the artifact file; when its
+    mtime or size changed, the new file is checksummed and loaded in a
+    background thread and swapped in once it is ready.
+    """
+
+    def __init__(self, check_interval=30):
+        self.check_interval = check_interval
+        self._artifacts = {}
+
+    def register(self, name, path, loader):
+        self._artifacts[name] = Artifact(name=name, path=path, loader=loader)
+
+    def get(self, name):
+        return self.get_loaded(name).value
+
+    def version(self, name):
+        return self.get_loaded(name).version
+
+    def get_loaded(self, name):
+        artifact = self._artifacts[name]
+        current = artifact.current
+        if current is None:
+            return self._load_initial(artifact)
+        if self._check_due(artifact):
+            self._check(artifact)
+        return current
+
+    def warm_up(self, names=None, background=False):
+        """Performs the first load of the given artifacts (default: all of them)."""
+        names = list(names or self._artifacts)
+        if background:
+            thread = threading.Thread(target=self._warm_up, args=(names,), name='model-registry-warm-up', daemon=True)
+            thread.start()
+            return thread
+        self._warm_up(names)
+        return None
+
+    def _warm_up(self, names):
+        for name in names:
+            try:
+                self.get_loaded(name)
+            except Exception:
+                logger.exception("Failed to warm up %s artifact", name)
+
+    def reload(self, name, wait=False):
+        """Loads the artifact again if its checksum changed. Returns the thread doing the work."""
+        artifact = self._artifacts[name]
+        thread = self._start_reload(artifact)
+        if wait and thread is not None:
+            thread.join()
+        return thread
+
+    def status(self):
+        status = {}
+        for name, artifact in self._artifacts.items():
+            current = artifact.current
+            status[name] = {
+                'path': artifact.path,
+                'version': current.version if current else None,
+                'loaded_at': current.loaded_at if current else None,
+                'loading': artifact.loading,
+                'last_error': artifact.last_error,
+            }
+        return status
+
+    def _load_initial(self, artifact):
+        with artifact.lock:
+            # Another thread may have finished the first load while we waited.
+            if artifact.current is None:
+                if artifact.last_error is not None and not self._check_due(artifact):
+                    raise ArtifactUnavailable(f"{artifact.name}: {artifact.last_error}")
+                artifact.last_checked = time.monotonic()
+                try:
+                    stat = os.stat(artifact.path)
+                    checksum = file_checksum(artifact.path)
+                    artifact.current = self._load(artifact, stat, checksum)
+                except Exception as e:
+                    artifact.last_error = str(e)
+                    raise
+                artifact.last_error = None
+            return artifact.current
+
+    def _check_due(self, artifact):
+        return self.check_interval is not None and time.monotonic() - artifact.last_checked >= self.check_interval
+
+    def _check(self, artifact):
+        artifact.last_checked = time.monotonic()
+        try:
+            stat = os.stat(artifact.path)
+        except OSError as e:
+            artifact.last_error = str(e)
+            return
+        current = artifact.current
+        if stat.st_mtime != current.mtime or stat.st_size != current.size:
+            self._start_reload(artifact)
+
+    def _start_reload(self, artifact):
+        with artifact.lock:
+            if artifact.loading:
+                return None
+            artifact.loading = True
+        thread = threading.Thread(
+            target=self._reload, args=(artifact,),
+            name=f'model-registry-{artifact.name}', daemon=True,
+        )
+        thread.start()
+        return thread
+
+    def _reload(self, artifact):
+        try:
+            stat = os.stat(artifact.path)
+            checksum = file_checksum(artifact.path)
+            current = artifact.current
+            if current is not None and checksum == current.checksum:
+                # Touched but unchanged: remember the new stat so we stop re-checking.
+                artifact.current = LoadedArtifact(
+                    value=current.value, version=current.version, checksum=checksum,
+                    mtime=stat.st_mtime, size=stat.st_size, loaded_at=current.loaded_at,
+                )
+                return
+            loaded = self._load(artifact, stat, checksum)
+            artifact.current = loaded
+            artifact.last_error = None
+            logger.info("Reloaded %s artifact, version %s", artifact.name, loaded.version)
+        except Exception as e:
+            artifact.last_error = str(e)
+            logger.exception("Failed to reload %s artifact from %s", artifact.name, artifact.path)
+        finally:
+            artifact.loading = False
+
+    def _load(self, artifact, stat, checksum):
+        value = artifact.loader(artifact.path)
+        return LoadedArtifact(
+            value=value,
+            version=checksum[:12],
+            checksum=checksum,
+            mtime=stat.st_mtime,
+            size=stat.st_size,
+            loaded_at=time.time(),
+        )
@@ -72,3 +72,26 @@ class Wishlist(models.Model):
 
     def __str__(self):
         return f"{self.customer.username} - {self.product.product_name}"
+
+
+class ProductRecommendation(models.Model):
+    recommendation_id = models.AutoField(primary_key=True)
+    sku = models.CharField(max_length=50)
+    rank = models.PositiveSmallIntegerField()
+    recommended_product = models.ForeignKey(
+        'admin_panel.Product',
+        on_delete=models.CASCADE,
+        related_name='recommended_with',
+        db_column='recommended_sku',
+    )
+    metric = models.CharField(max_length=20, default='confidence')
+    score = models.FloatField()
+    # Version of the rules artifact the row was computed from (ModelRegistry.version('rules')).
+    rules_version = models.CharField(max_length=12, default='')
+
+    class Meta:
+        unique_together = ['sku', 'metric', 'rank']
+        ordering = ['sku', 'metric', 'rank']
+
+    def __str__(self):
+        return f"{self.sku} -> {self.recommended_product_id} ({self.metric} #{self.rank})"
@@ -0,0 +1,141 @@
+"""Plain NumPy copies of fitted scikit-learn classifiers.
+
+export_classifier() turns a decision tree, a forest of trees or a linear
+classifier into arrays saved with np.savez(); NumpyClassifier evaluates them
+the same way scikit-learn does, so serving processes never import sklearn.
+"""
+
+TREE_ARRAYS = ('children_left', 'children_right', 'feature', 'threshold', 'missing_go_to_left')
+
+
+class UnsupportedModel(Exception):
+    pass
+
+
+def export_classifier(model, path):
+    """Saves the model's parameters to an .npz file for NumpyClassifier.load()."""
+    import numpy as np
+
+    classes = np.asarray(model.classes_)
+    if classes.dtype == object:
+        # String labels; np.load(allow_pickle=False) can't read object arrays.
+        classes = classes.astype(str)
+    arrays = {'classes': classes}
+    feature_names = getattr(model, 'feature_names_in_', None)
+    if feature_names is not None:
+        arrays['feature_names'] = np.asarray(feature_names, dtype=str)
+
+    if getattr(model, 'n_outputs_', 1) != 1:
+        raise UnsupportedModel("Only single-output classifiers can be exported")
+
+    if hasattr(model, 'tree_'):
+        trees = [model.tree_]
+    elif hasattr(model, 'estimators_') and all(hasattr(e, 'tree_') for e in model.estimators_):
+        # RandomForestClassifier / ExtraTreesClassifier average their trees' probabilities.
+        trees = [estimator.tree_ for estimator in model.estimators_]
+    elif hasattr(model, 'coef_') and hasattr(model, 'intercept_'):
+        arrays['kind'] = np.array('linear')
+        arrays['coef'] = np.asarray(model.coef_, dtype=np.float64)
+        arrays['intercept'] = np.asarray(model.intercept_, dtype=np.float64)
+        np.savez(path, **arrays)
+        return
+    else:
+        raise UnsupportedModel(f"Don't know how to export {type(model).__name__}")
+
+    # All trees are concatenated; node ids are shifted by each tree's offset.
+    offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+    arrays['kind'] = np.array('trees')
+    arrays['roots'] = offsets[:-1].astype(np.int64)
+    for name in TREE_ARRAYS:
+        parts = []
+        for offset, tree in zip(offsets, trees):
+            values = np.asarray(getattr(tree, name))
+            if name.startswith('children_'):
+                values = np.where(values >= 0, values + offset, -1)
+            parts.append(values)
+        arrays[name] = np.concatenate(parts)
+    # Per-node class probabilities, as DecisionTreeClassifier.predict_proba() returns them.
+    probabilities = []
+    for tree in trees:
+        value = np.asarray(tree.value)[:, 0, :]
+        totals = value.sum(axis=1, keepdims=True)
+        if np.allclose(totals, 1):
+            # scikit-learn >= 1.4 stores the fractions themselves and returns
+            # them as they are; dividing by their sum again can change the last bit.
+            probabilities.append(value)
+            continue
+        totals[totals == 0] = 1
+        probabilities.append(value / totals)
+    arrays['probabilities'] = np.concatenate(probabilities)
+    np.savez(path, **arrays)
+
+
+class NumpyClassifier:
+    """Predicts with the arrays written by export_classifier()."""
+
+    def __init__(self, arrays):
+        self.kind = str(arrays['kind'])
+        self.classes_ = arrays['classes']
+        if 'feature_names' in arrays:
+            # FeatureEncoder.for_model() reads the column order from here.
+            self.feature_names_in_ = arrays['feature_names']
+        self._arrays = {name: arrays[name] for name in arrays.files if name not in ('kind', 'classes')}
+
+    @classmethod
+    def load(cls, path):
+        import numpy as np
+
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls(arrays)
+
+    def predict(self, X):
+        import numpy as np
+
+        if self.kind == 'linear':
+            scores = self.decision_function(X)
+            if scores.ndim == 1:
+                return self.classes_[(scores > 0).astype(np.intp)]
+            return self.classes_[scores.argmax(axis=1)]
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def decision_function(self, X):
+        import numpy as np
+
+        coef, intercept = self._arrays['coef'], self._arrays['intercept']
+        scores = np.asarray(X, dtype=np.float64) @ coef.T + intercept
+        return scores.ravel() if scores.shape[1] == 1 else scores
+
+    def predict_proba(self, X):
+        import numpy as np
+
+        if self.kind == 'linear':
+            raise AttributeError("predict_proba is not exported for linear models")
+
+        # Trees compare float32 features against float64 thresholds.
+        X = np.asarray(X, dtype=np.float32)
+        roots = self._arrays['roots']
+        proba = np.zeros((len(X), len(self.classes_)), dtype=np.float64)
+        for root in roots:
+            proba += self._arrays['probabilities'][self._leaves(X, root)]
+        if len(roots) > 1:
+            proba /= len(roots)
+        return proba
+
+    def _leaves(self, X, root):
+        import numpy as np
+
+        left, right = self._arrays['children_left'], self._arrays['children_right']
+        feature, threshold = self._arrays['feature'], self._arrays['threshold']
+        missing_go_to_left = self._arrays['missing_go_to_left']
+
+        rows = np.arange(len(X))
+        nodes = np.full(len(X), root, dtype=np.int64)
+        active = left[nodes] != -1
+        while active.any():
+            current = nodes[active]
+            values = X[rows[active], feature[current]]
+            go_left = values <= threshold[current]
+            go_left |= np.isnan(values) & missing_go_to_left[current].astype(bool)
+            nodes[active] = np.where(go_left, left[current], right[current])
+            active = left[nodes] != -1
+        return nodes
@@ -0,0 +1,116 @@
+"""Keyset (seek) pagination for product listings.
+
+A cursor holds the sort value and SKU of the last product shown (or the
+first, when going back), and the next page is read with a WHERE on
+(sort value, sku) that the composite indexes on Product can seek to,
+instead of an OFFSET that walks every earlier row. Nothing is counted;
+approximate_count() gives a cached total for the pages that show one.
+"""
+import base64
+import binascii
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+# sort parameter -> (field, descending). SKU breaks ties in the same direction.
+SORT_ORDERS = {
+    'name-asc': ('product_name', False),
+    'name-desc': ('product_name', True),
+    'price-asc': ('unit_price', False),
+    'price-desc': ('unit_price', True),
+    'rating-desc': ('product_rating', True),
+    'rating-asc': ('product_rating', False),
+}
+DEFAULT_SORT = 'name-asc'
+
+# Cursor values go through JSON, so restore each field's Python type.
+FIELD_TYPES = {
+    'product_name': str,
+    'unit_price': Decimal,
+    'product_rating': float,
+}
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(value, sku, backwards=False):
+    data = json.dumps([str(value), sku, backwards], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, field):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, sku, backwards = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return FIELD_TYPES[field](value), str(sku), bool(backwards)
+    except (binascii.Error, ValueError, TypeError, InvalidOperation, UnicodeDecodeError) as e:
+        raise InvalidCursor(str(e)) from e
+
+
+class KeysetPage:
+    def __init__(self, object_list, field, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = self.previous_cursor = None
+        if has_next and object_list:
+            last = object_list[-1]
+            self.next_cursor = encode_cursor(getattr(last, field), last.sku)
+        if has_previous and object_list:
+            first = object_list[0]
+            self.previous_cursor = encode_cursor(getattr(first, field), first.sku, backwards=True)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def keyset_page(queryset, sort_by, cursor=None, per_page=20):
+    """One page of `queryset` in `sort_by` order, starting after `cursor`.
+
+    An invalid cursor gives the first page, as an invalid page number does
+    for the offset paginator.
+    """
+    field, descending = SORT_ORDERS.get(sort_by, SORT_ORDERS[DEFAULT_SORT])
+    backwards = False
+    if cursor:
+        try:
+            value, sku, backwards = decode_cursor(cursor, field)
+        except InvalidCursor:
+            cursor = None
+
+    # Reading backwards is the same seek with the order reversed.
+    reverse = descending != backwards
+    ordering = [f'-{field}', '-sku'] if reverse else [field, 'sku']
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        # (field, sku) > (value, sku), written with a plain bound on field
+        # so that SQLite seeks the index instead of scanning it.
+        after = 'lt' if reverse else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{field}__{after}e': value}),
+            Q(**{f'{field}__{after}': value}) | Q(**{f'sku__{after}': sku}),
+        )
+
+    rows = list(queryset[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+        return KeysetPage(rows, field, has_next=True, has_previous=has_more)
+    return KeysetPage(rows, field, has_next=has_more, has_previous=bool(cursor))
+
+
+def approximate_count(queryset):
+    """queryset.count(), cached for PRODUCT_COUNT_CACHE_TIMEOUT seconds per distinct query."""
+    sql, params = queryset.order_by().query.sql_with_params()
+    key = 'customer_website:count:' + hashlib.sha1(repr((sql, params)).encode()).hexdigest()
+    return cache.get_or_set(key, queryset.count, getattr(settings, 'PRODUCT_COUNT_CACHE_TIMEOUT', 300))
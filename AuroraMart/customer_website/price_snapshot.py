@@ -0,0 +1,169 @@
+"""Catalog prices in every display currency, converted once.
+
+A snapshot holds each product's price in each currency as integer cents,
+one array per currency, indexed by the product's position in `index`. It
+is built with one query per process, using the same Decimal rounding the
+views used to apply per request, so showing a price is a dict lookup and
+an array read. The rates are constants: changing one means a deploy, and
+with it a fresh snapshot.
+
+Product saves and deletes in this process patch the product's entries in
+place once their transaction commits, so rolled-back changes never show.
+Other processes notice the version token in the (shared) Django cache
+change and rebuild theirs; they check it at most every
+PRICE_SNAPSHOT_CHECK_INTERVAL seconds, as a page makes dozens of lookups.
+The token also expires, so writes that skip signals are picked up within
+CATALOG_CACHE_TIMEOUT.
+
+Amounts that aren't current catalog prices (session cart prices, order
+totals, shipping) go through convert_amount().
+"""
+import threading
+import time
+import uuid
+from array import array
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CURRENCIES = {
+    'SGD': {'code': 'SGD', 'rate': Decimal('1.0'), 'symbol': 'S$'},
+    'USD': {'code': 'USD', 'rate': Decimal('0.74'), 'symbol': '$'},
+    'EUR': {'code': 'EUR', 'rate': Decimal('0.68'), 'symbol': '€'},
+    'JPY': {'code': 'JPY', 'rate': Decimal('110.5'), 'symbol': '¥'},
+    'GBP': {'code': 'GBP', 'rate': Decimal('0.58'), 'symbol': '£'},
+}
+DEFAULT_CURRENCY = 'SGD'
+
+VERSION_KEY = 'customer_website:price_snapshot_version'
+
+CENT = Decimal('0.01')
+
+CHECK_INTERVAL = getattr(settings, 'PRICE_SNAPSHOT_CHECK_INTERVAL', 5)
+
+
+def _decimal(amount):
+    # Session carts store prices as floats; str() gives back the price that was stored.
+    return Decimal(str(amount)) if isinstance(amount, float) else Decimal(amount)
+
+
+def to_cents(amount, rate):
+    return int((_decimal(amount) * rate).quantize(CENT) * 100)
+
+
+def from_cents(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+class PriceSnapshot:
+    def __init__(self, rows=(), currencies=CURRENCIES):
+        self.currencies = currencies
+        self.index = {}
+        self.cents = {code: array('q') for code in currencies}
+        for sku, unit_price in rows:
+            self.set(sku, unit_price)
+
+    def __len__(self):
+        return len(self.index)
+
+    def lookup(self, sku, code):
+        """Cents for `sku` in `code`, or None if the snapshot doesn't have them."""
+        position = self.index.get(sku)
+        column = self.cents.get(code)
+        if position is None or column is None:
+            return None
+        return column[position]
+
+    def set(self, sku, unit_price):
+        position = self.index.get(sku)
+        if position is None:
+            # Appended before the sku is indexed, so readers never see a missing position.
+            for code, info in self.currencies.items():
+                self.cents[code].append(to_cents(unit_price, info['rate']))
+            self.index[sku] = len(self.cents[DEFAULT_CURRENCY]) - 1
+            return
+        for code, info in self.currencies.items():
+            self.cents[code][position] = to_cents(unit_price, info['rate'])
+
+    def remove(self, sku):
+        # The cents stay behind until the next rebuild; nothing points at them.
+        self.index.pop(sku, None)
+
+
+def build_price_snapshot():
+    from admin_panel.models import Product
+
+    return PriceSnapshot(Product.objects.order_by().values_list('sku', 'unit_price'))
+
+
+_lock = threading.Lock()
+_snapshot = (None, None, 0.0)
+
+
+def _current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(VERSION_KEY, version, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def get_price_snapshot():
+    global _snapshot
+    _, snapshot, checked_at = _snapshot
+    now = time.monotonic()
+    if snapshot is not None and now - checked_at < CHECK_INTERVAL:
+        return snapshot
+    version = _current_version()
+    with _lock:
+        snapshot_version, snapshot, _ = _snapshot
+        if snapshot is None or snapshot_version != version:
+            snapshot = build_price_snapshot()
+        _snapshot = (version, snapshot, now)
+    return snapshot
+
+
+def _updated(change):
+    """Applies `change` to this process's snapshot and tells other processes to rebuild."""
+    global _snapshot
+    version = uuid.uuid4().hex
+    with _lock:
+        snapshot_version, snapshot, checked_at = _snapshot
+        current = cache.get(VERSION_KEY)
+        cache.set(VERSION_KEY, version, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+        if snapshot is not None and snapshot_version == current:
+            change(snapshot)
+            _snapshot = (version, snapshot, checked_at)
+        else:
+            # Already behind another process's changes: rebuild on next use.
+            _snapshot = (None, None, 0.0)
+
+
+def product_saved(sender, instance, update_fields=None, using=None, **kwargs):
+    if update_fields is not None and 'unit_price' not in update_fields:
+        return
+    sku, unit_price = instance.sku, instance.unit_price
+    # After the commit, so that other processes rebuild from the new price.
+    transaction.on_commit(lambda: _updated(lambda snapshot: snapshot.set(sku, unit_price)), using=using)
+
+
+def product_deleted(sender, instance, using=None, **kwargs):
+    sku = instance.sku
+    transaction.on_commit(lambda: _updated(lambda snapshot: snapshot.remove(sku)), using=using)
+
+
+def convert_amount(amount, currency_info):
+    """`amount` (in SGD) in the display currency, for amounts that aren't catalog prices."""
+    return (_decimal(amount) * currency_info['rate']).quantize(CENT)
+
+
+def product_price(product, currency_info):
+    """The display price of `product`, or of anything else with a sku and a unit_price."""
+    cents = get_price_snapshot().lookup(product.sku, currency_info.get('code', DEFAULT_CURRENCY))
+    if cents is None:
+        # Not in this process's snapshot yet, e.g. saved by a write that skipped signals.
+        return convert_amount(product.unit_price, currency_info)
+    return from_cents(cents)
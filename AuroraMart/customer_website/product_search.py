@@ -0,0 +1,159 @@
+"""Full-text product search on the FTS5 table created by admin_panel migration 0020.
+
+admin_panel_product_fts has one row per product: its sku (stored, not
+searched) and its name, description and category names. The Product and
+Category signal handlers below keep it in sync. Writes that skip signals
+(queryset.update(), raw SQL, bulk_create()) have to call index_products()
+themselves, or run `manage.py rebuild_product_search_index` afterwards.
+
+There are deliberately no triggers: SQLite rebuilds a table for most
+ALTERs Django makes, which drops a table's triggers and fails on triggers
+elsewhere that name it.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from admin_panel.models import Product
+
+FTS_TABLE = 'admin_panel_product_fts'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Product fields the index is built from; saves limited to other fields leave it alone.
+INDEXED_FIELDS = {'product_name', 'description', 'category', 'category_id', 'subcategory', 'subcategory_id'}
+
+# Category names of product row p: its category, then its subcategory.
+CATEGORY_NAMES = (
+    "trim(coalesce((SELECT name FROM admin_panel_category WHERE category_id = p.category_id), '')"
+    " || ' ' || coalesce((SELECT name FROM admin_panel_category WHERE category_id = p.subcategory_id), ''))"
+)
+
+# Stays under SQLITE_MAX_VARIABLE_NUMBER on old SQLite builds.
+BATCH_SIZE = 500
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """FTS5 query matching every word of `query`, the last one as a prefix.
+
+    Words are quoted so that FTS5 syntax typed into the search box (AND,
+    NEAR, '-', '"', ...) is searched for rather than interpreted. Returns
+    None when there are no words to search for.
+    """
+    tokens = TOKEN_RE.findall(query.lower())
+    if not tokens:
+        return None
+    # Every word is a prefix: the box is searched on each keystroke.
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_products(queryset, query, ranked=False):
+    """`queryset` narrowed to products matching `query`.
+
+    With ranked=True the products are ordered best match first, by the
+    bm25 score annotated as search_rank; it is only computed then.
+    """
+    if not fts_available():
+        return queryset.filter(product_name__icontains=query)
+
+    expression = match_expression(query)
+    if expression is None:
+        return queryset.none()
+    matching = RawSQL(f'SELECT sku FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (expression,))
+    queryset = queryset.filter(sku__in=matching)
+    if not ranked:
+        return queryset
+    # rank is the weighted bm25() score set up by the migration; lower is
+    # better. sku isn't indexed, so the matches are read once into a
+    # temporary table that SQLite indexes on sku; LIMIT -1 stops it from
+    # flattening the subquery into a full MATCH for every product.
+    rank = RawSQL(
+        f'SELECT matches.rank FROM (SELECT sku, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT -1) matches '
+        f'WHERE matches.sku = {Product._meta.db_table}.sku',
+        (expression,),
+    )
+    return queryset.annotate(search_rank=rank).order_by('search_rank', 'sku')
+
+
+def ranked_skus(query, limit=None):
+    """SKUs of the products matching `query`, best match first, in one FTS query."""
+    if not fts_available():
+        skus = Product.objects.filter(product_name__icontains=query).values_list('sku', flat=True)
+        return list(skus[:limit] if limit is not None else skus)
+
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    sql = f'SELECT sku FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank, sku'
+    params = [expression]
+    if limit is not None:
+        sql += ' LIMIT %s'
+        params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [sku for (sku,) in cursor.fetchall()]
+
+
+def index_products(skus):
+    """Re-reads the index rows of `skus` from the product table; deleted products lose theirs."""
+    if not fts_available():
+        return
+    skus = list(skus)
+    with connection.cursor() as cursor:
+        for start in range(0, len(skus), BATCH_SIZE):
+            batch = skus[start:start + BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE sku IN ({placeholders})', batch)
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (sku, product_name, description, category_name) '
+                f'SELECT p.sku, p.product_name, p.description, {CATEGORY_NAMES} '
+                f'FROM admin_panel_product p WHERE p.sku IN ({placeholders})',
+                batch,
+            )
+
+
+def rebuild_index():
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (sku, product_name, description, category_name) '
+            f'SELECT p.sku, p.product_name, p.description, {CATEGORY_NAMES} FROM admin_panel_product p'
+        )
+
+
+def _category_skus(category_id):
+    return list(
+        Product.objects.filter(Q(category_id=category_id) | Q(subcategory_id=category_id)).values_list('sku', flat=True)
+    )
+
+
+def product_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or INDEXED_FIELDS & set(update_fields):
+        index_products([instance.sku])
+
+
+def product_deleted(sender, instance, **kwargs):
+    index_products([instance.sku])
+
+
+def category_saved(sender, instance, created=False, **kwargs):
+    # A new category has no products yet; a renamed one changes its products' rows.
+    if not created:
+        index_products(_category_skus(instance.pk))
+
+
+def category_deleting(sender, instance, **kwargs):
+    # Its products are set to NULL before post_delete, so find them now.
+    instance._search_skus = _category_skus(instance.pk)
+
+
+def category_deleted(sender, instance, **kwargs):
+    index_products(getattr(instance, '_search_skus', ()))
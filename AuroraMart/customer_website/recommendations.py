@@ -0,0 +1,421 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class CompactRuleStore:
+    """Association rules packed into NumPy arrays.
+
+    SKUs are interned to integer ids. Antecedents and consequents are stored
+    CSR-style (an offsets array into a flat array of SKU ids) and metrics as
+    float32 columns. For the ranking metrics, each SKU also gets a posting
+    list of the rules it appears in as an antecedent, best rule first.
+    """
+
+    PRECOMPUTED_METRICS = ('confidence', 'lift')
+
+    def __init__(self, rules):
+        import numpy as np
+
+        antecedents = [tuple(antecedent) for antecedent in rules['antecedents']]
+        # Consequents keep the frozensets' iteration order so that filling a set
+        # from them reproduces the set built by the DataFrame implementation.
+        consequents = [tuple(consequent) for consequent in rules['consequents']]
+
+        self.skus = sorted({sku for group in antecedents + consequents for sku in group})
+        self.sku_ids = {sku: i for i, sku in enumerate(self.skus)}
+
+        self.antecedent_offsets, self.antecedent_indices = self._pack(antecedents)
+        self.consequent_offsets, self.consequent_indices = self._pack(consequents)
+
+        self.metrics = {}
+        self._ranks = {}
+        self._postings = {}
+        for column in rules.columns:
+            if column in ('antecedents', 'consequents') or rules[column].dtype.kind not in 'if':
+                continue
+            values = rules[column].to_numpy(dtype=np.float64)
+            self.metrics[column] = values.astype(np.float32)
+            if column in self.PRECOMPUTED_METRICS:
+                # Ranked from the float64 values so float32 rounding can't reorder rules.
+                self._build_postings(column, values)
+
+    def save(self, directory):
+        """Writes the arrays as .npy files that load() can memory-map."""
+        import numpy as np
+
+        os.makedirs(directory, exist_ok=True)
+        for name, array in self._named_arrays():
+            np.save(os.path.join(directory, f'{name}.npy'), array)
+        manifest = {
+            'skus': self.skus,
+            'metrics': list(self.metrics),
+            'postings': list(self._postings),
+        }
+        with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """Opens a store written by save().
+
+        With mmap_mode='r' the arrays are read-only views of the files, so every
+        process that opens the same directory shares one copy in the page cache.
+        """
+        import numpy as np
+
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            manifest = json.load(f)
+
+        def load_array(name):
+            return np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+
+        store = cls.__new__(cls)
+        store.skus = manifest['skus']
+        store.sku_ids = {sku: i for i, sku in enumerate(store.skus)}
+        store.antecedent_offsets = load_array('antecedent_offsets')
+        store.antecedent_indices = load_array('antecedent_indices')
+        store.consequent_offsets = load_array('consequent_offsets')
+        store.consequent_indices = load_array('consequent_indices')
+        store.metrics = {metric: load_array(f'metric_{i}') for i, metric in enumerate(manifest['metrics'])}
+        store._ranks = {}
+        store._postings = {}
+        for i, metric in enumerate(manifest['postings']):
+            store._ranks[metric] = load_array(f'ranks_{i}')
+            store._postings[metric] = (load_array(f'posting_offsets_{i}'), load_array(f'posting_rules_{i}'))
+        return store
+
+    def _named_arrays(self):
+        yield 'antecedent_offsets', self.antecedent_offsets
+        yield 'antecedent_indices', self.antecedent_indices
+        yield 'consequent_offsets', self.consequent_offsets
+        yield 'consequent_indices', self.consequent_indices
+        # Metric names such as 'antecedent support' are not file names, so
+        # arrays are numbered by their position in the manifest.
+        for i, values in enumerate(self.metrics.values()):
+            yield f'metric_{i}', values
+        for i, metric in enumerate(self._postings):
+            offsets, rule_ids = self._postings[metric]
+            yield f'ranks_{i}', self._ranks[metric]
+            yield f'posting_offsets_{i}', offsets
+            yield f'posting_rules_{i}', rule_ids
+
+    def _pack(self, groups):
+        import numpy as np
+
+        lengths = np.fromiter((len(group) for group in groups), dtype=np.int32, count=len(groups))
+        offsets = np.zeros(len(groups) + 1, dtype=np.int32)
+        np.cumsum(lengths, out=offsets[1:])
+        indices = np.fromiter(
+            (self.sku_ids[sku] for group in groups for sku in group),
+            dtype=np.int32, count=int(offsets[-1]),
+        )
+        return offsets, indices
+
+    def _build_postings(self, metric, values):
+        import numpy as np
+
+        # Same order as sort_values(ascending=False, kind='stable'): ties keep
+        # their row order and NaN scores go last.
+        order = np.argsort(-values, kind='stable')
+        ranks = np.empty(len(order), dtype=np.int32)
+        ranks[order] = np.arange(len(order), dtype=np.int32)
+
+        entry_rules = np.repeat(
+            np.arange(len(self), dtype=np.int32), np.diff(self.antecedent_offsets)
+        )
+        entry_skus = self.antecedent_indices
+        by_sku_then_rank = np.lexsort((ranks[entry_rules], entry_skus))
+
+        offsets = np.zeros(len(self.skus) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(entry_skus, minlength=len(self.skus)), out=offsets[1:])
+
+        self._ranks[metric] = ranks
+        self._postings[metric] = (offsets, entry_rules[by_sku_then_rank])
+
+    def _get_postings(self, metric):
+        import numpy as np
+
+        if metric not in self._postings:
+            if metric not in self.metrics:
+                raise KeyError(metric)
+            self._build_postings(metric, self.metrics[metric].astype(np.float64))
+        return self._postings[metric]
+
+    def __len__(self):
+        return len(self.antecedent_offsets) - 1
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for _, array in self._named_arrays())
+
+    def antecedent_skus(self):
+        import numpy as np
+
+        return {self.skus[i] for i in np.unique(self.antecedent_indices).tolist()}
+
+    def consequents(self, rule_id):
+        start, end = self.consequent_offsets[rule_id], self.consequent_offsets[rule_id + 1]
+        return [self.skus[i] for i in self.consequent_indices[start:end].tolist()]
+
+    def ranked_rules(self, items, metric='confidence', limit=None):
+        """Returns ids of rules whose antecedents contain any of the items, best first."""
+        import numpy as np
+
+        offsets, rule_ids = self._get_postings(metric)
+
+        chunks = []
+        for sku in set(items):
+            sku_id = self.sku_ids.get(sku)
+            if sku_id is None:
+                continue
+            start, end = offsets[sku_id], offsets[sku_id + 1]
+            if limit is not None:
+                end = min(end, start + limit)
+            chunks.append(rule_ids[start:end])
+
+        if not chunks:
+            return rule_ids[:0]
+        if len(chunks) == 1:
+            return chunks[0]
+
+        # Each chunk is already the best `limit` rules of one SKU, so the best
+        # `limit` rules of the basket are among them.
+        matched = np.unique(np.concatenate(chunks))
+        matched = matched[np.argsort(self._ranks[metric][matched])]
+        return matched if limit is None else matched[:limit]
+
+    def candidates(self, items, metric='confidence', top_n=5):
+        """The set recommend() truncates: consequents of the best top_n * 3 rules."""
+        recommendations = set()
+        for rule_id in self.ranked_rules(items, metric, limit=top_n * 3).tolist():
+            # Updating from a frozenset (rather than a list) keeps the set's
+            # iteration order close to the DataFrame implementation's.
+            recommendations.update(frozenset(self.consequents(rule_id)))
+
+        recommendations.difference_update(items)
+        return recommendations
+
+    def recommend(self, items, metric='confidence', top_n=5):
+        return list(self.candidates(items, metric, top_n))[:top_n]
+
+    def scored_recommendations(self, items, metric='confidence', top_n=5):
+        """Like recommend(), but ordered by the best score of the rule that produced each SKU."""
+        values = self.metrics[metric]
+        scored = []
+        seen = set(items)
+        for rule_id in self.ranked_rules(items, metric, limit=top_n * 3).tolist():
+            for sku in sorted(self.consequents(rule_id)):
+                if sku not in seen:
+                    seen.add(sku)
+                    scored.append((sku, float(values[rule_id])))
+        return scored[:top_n]
+
+    def recommend_batch(self, baskets, metric='confidence', top_n=5):
+        """scored_recommendations() for many baskets at once.
+
+        Every step works on flat (basket, rule) and (basket, SKU) arrays, so the
+        cost is a handful of NumPy sorts over all baskets rather than a Python
+        loop per basket. Returns one [(sku, score), ...] list per basket.
+        """
+        import numpy as np
+
+        baskets = list(baskets)
+        limit = top_n * 3
+        offsets, posting_rules = self._get_postings(metric)
+        ranks = self._ranks[metric]
+        values = self.metrics[metric]
+        n_skus = len(self.skus)
+
+        # (basket, sku id) pairs for the SKUs the rules know about.
+        basket_ids, item_ids = [], []
+        for basket_id, items in enumerate(baskets):
+            for sku in set(items):
+                sku_id = self.sku_ids.get(sku)
+                if sku_id is not None:
+                    basket_ids.append(basket_id)
+                    item_ids.append(sku_id)
+        basket_ids = np.array(basket_ids, dtype=np.int64)
+        item_ids = np.array(item_ids, dtype=np.int64)
+
+        results = [[] for _ in baskets]
+        if not len(item_ids):
+            return results
+
+        # Rules are handled by rank, so one sort of basket * n_rules + rank both
+        # groups rows by basket and puts each basket's best rules first.
+        n_rules = len(self)
+        rules_by_rank = np.empty(n_rules, dtype=np.int64)
+        rules_by_rank[ranks] = np.arange(n_rules)
+
+        # Gather the best `limit` rules of each item's posting list.
+        starts = offsets[item_ids].astype(np.int64)
+        lengths = np.minimum(offsets[item_ids + 1] - starts, limit)
+        rule_ids = posting_rules[np.repeat(starts, lengths) + self._run_offsets(lengths)]
+        keys = np.sort(np.repeat(basket_ids, lengths) * n_rules + ranks[rule_ids])
+
+        # Drop rules matched through several items, then keep the best `limit`
+        # rules per basket.
+        keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+        pair_basket, pair_rank = np.divmod(keys, n_rules)
+        keep = self._group_positions(pair_basket) < limit
+        pair_basket, pair_rank = pair_basket[keep], pair_rank[keep]
+
+        # Expand the kept rules into (basket, SKU, rank) rows, one per consequent.
+        pair_rule = rules_by_rank[pair_rank]
+        starts = self.consequent_offsets[pair_rule].astype(np.int64)
+        lengths = self.consequent_offsets[pair_rule + 1] - starts
+        row_sku = self.consequent_indices[np.repeat(starts, lengths) + self._run_offsets(lengths)]
+        basket_skus = np.repeat(pair_basket, lengths) * n_skus + row_sku
+
+        # SKUs already in the basket are not recommended.
+        item_keys = np.sort(basket_ids * n_skus + item_ids)
+        found = np.minimum(np.searchsorted(item_keys, basket_skus), len(item_keys) - 1)
+        rows = item_keys[found] != basket_skus
+        keys = np.sort(basket_skus[rows] * n_rules + np.repeat(pair_rank, lengths)[rows])
+
+        # Each SKU keeps the best rule that produced it; a basket's SKUs are
+        # then ordered by that rule, ties by SKU, as scored_recommendations does.
+        basket_skus, row_rank = np.divmod(keys, n_rules)
+        best = np.r_[True, basket_skus[1:] != basket_skus[:-1]]
+        row_basket, row_sku = np.divmod(basket_skus[best], n_skus)
+        keys = np.sort((row_basket * n_rules + row_rank[best]) * n_skus + row_sku)
+        basket_ranks, row_sku = np.divmod(keys, n_skus)
+        row_basket, row_rank = np.divmod(basket_ranks, n_rules)
+        keep = self._group_positions(row_basket) < top_n
+
+        scores = values[rules_by_rank[row_rank[keep]]].tolist()
+        for basket_id, sku_id, score in zip(row_basket[keep].tolist(), row_sku[keep].tolist(), scores):
+            results[basket_id].append((self.skus[sku_id], score))
+        return results
+
+    @staticmethod
+    def _run_offsets(lengths):
+        """For runs of the given lengths laid end to end, each element's offset within its run."""
+        import numpy as np
+
+        return np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+    @staticmethod
+    def _group_positions(groups):
+        """Position of each element within its run of equal values in a sorted array."""
+        import numpy as np
+
+        if not len(groups):
+            return groups
+        starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        lengths = np.diff(np.r_[starts, len(groups)])
+        return np.arange(len(groups)) - np.repeat(starts, lengths)
+
+
+def reference_candidates(rules, items, metric='confidence', top_n=5):
+    """The original DataFrame scan, kept to check CompactRuleStore against.
+
+    Returns the set that get_recommendations() used to truncate to top_n. Which
+    top_n of them came out depended on set iteration order, which changes with
+    the interpreter's hash seed, so only the candidate set is comparable.
+    """
+    mask = rules['antecedents'].apply(lambda x: any(item in x for item in items))
+    relevant_rules = rules[mask]
+    if len(relevant_rules) == 0:
+        return set()
+
+    sorted_rules = relevant_rules.sort_values(by=metric, ascending=False, kind='stable')
+
+    recommendations = set()
+    for _, row in sorted_rules.head(top_n * 3).iterrows():
+        recommendations.update(row['consequents'])
+
+    recommendations.difference_update(items)
+    return recommendations
+
+
+def load_rule_store(path):
+    import joblib
+
+    return CompactRuleStore(joblib.load(path))
+
+
+def export_rule_store(store, root):
+    """Saves the store under `root` for load_mapped_rule_store().
+
+    Each export gets its own directory and `root/rules.json` is switched to it
+    last, so workers still mapping the previous export are never affected.
+    Returns the path of rules.json.
+    """
+    directory = f'rules-{time.strftime("%Y%m%d%H%M%S")}-{os.getpid()}'
+    store.save(os.path.join(root, directory))
+    pointer = os.path.join(root, 'rules.json')
+    tmp_pointer = f'{pointer}.tmp'
+    with open(tmp_pointer, 'w') as f:
+        json.dump({'directory': directory}, f)
+    os.replace(tmp_pointer, pointer)
+    return pointer
+
+
+def load_mapped_rule_store(pointer):
+    """Memory-maps the export that `pointer` (a rules.json file) refers to."""
+    with open(pointer) as f:
+        directory = json.load(f)['directory']
+    return CompactRuleStore.load(os.path.join(os.path.dirname(pointer), directory))
+
+
+class RecommendationCache:
+    """Bounded LRU cache of basket recommendations for a single CompactRuleStore."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._index = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def recommend(self, index, items, metric='confidence', top_n=5):
+        key = (frozenset(items), metric, top_n)
+        with self._lock:
+            if index is not self._index:
+                # The rules were reloaded: nothing cached so far is valid.
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._index = index
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(cached)
+            self.misses += 1
+
+        result = index.recommend(items, metric=metric, top_n=top_n)
+
+        if self.maxsize > 0:
+            with self._lock:
+                if index is self._index:
+                    self._entries[key] = tuple(result)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
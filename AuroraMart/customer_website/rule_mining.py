@@ -0,0 +1,141 @@
+import math
+import os
+import tempfile
+from collections import Counter
+from itertools import combinations, groupby
+
+
+class SupportCounts:
+    """Item and item-pair transaction counts, updated one order at a time.
+
+    The counts are everything needed to derive 1 -> 1 association rules, so
+    they can be saved between runs and only new orders have to be counted.
+
+    `counted_until` is the latest order_date counted so far. Orders are
+    completed some time after they are placed, so each run also rereads a
+    lookback window before it; `recent_orders` holds the ids counted within
+    that window so that none is counted twice, and is pruned as the mark
+    moves on.
+    """
+
+    def __init__(self):
+        self.transactions = 0
+        self.item_counts = Counter()
+        self.pair_counts = Counter()
+        self.counted_until = None
+        self.recent_orders = {}
+
+    def add(self, order_id, order_date, skus):
+        if order_id in self.recent_orders:
+            return False
+        skus = sorted(set(skus))
+        self.transactions += 1
+        self.item_counts.update(skus)
+        self.pair_counts.update(combinations(skus, 2))
+        self.recent_orders[order_id] = order_date
+        if self.counted_until is None or order_date > self.counted_until:
+            self.counted_until = order_date
+        return True
+
+    def window_start(self, lookback):
+        """order_date from which the next run has to read orders."""
+        return None if self.counted_until is None else self.counted_until - lookback
+
+    def prune(self, lookback):
+        start = self.window_start(lookback)
+        if start is not None:
+            self.recent_orders = {
+                order_id: order_date for order_id, order_date in self.recent_orders.items() if order_date >= start
+            }
+
+    def rules(self, min_support=0.0, min_confidence=0.0):
+        """Builds a rules DataFrame with mlxtend's association_rules() columns.
+
+        Support thresholds are fractions of all counted transactions.
+        """
+        import pandas as pd
+
+        n = self.transactions
+        rows = []
+        for (a, b), pair_count in self.pair_counts.items():
+            support = pair_count / n
+            if support < min_support:
+                continue
+            for antecedent, consequent in ((a, b), (b, a)):
+                antecedent_support = self.item_counts[antecedent] / n
+                consequent_support = self.item_counts[consequent] / n
+                confidence = support / antecedent_support
+                if confidence < min_confidence:
+                    continue
+                rows.append(_rule_row(antecedent, consequent, antecedent_support, consequent_support, support))
+
+        columns = [
+            'antecedents', 'consequents', 'antecedent support', 'consequent support',
+            'support', 'confidence', 'lift', 'leverage', 'conviction', 'zhangs_metric',
+        ]
+        rules = pd.DataFrame(rows, columns=columns)
+        return rules.sort_values(['confidence', 'lift'], ascending=False, kind='stable', ignore_index=True)
+
+
+def _rule_row(antecedent, consequent, antecedent_support, consequent_support, support):
+    confidence = support / antecedent_support
+    lift = confidence / consequent_support
+    leverage = support - antecedent_support * consequent_support
+    conviction = (1 - consequent_support) / (1 - confidence) if confidence < 1 else math.inf
+    denominator = max(support * (1 - antecedent_support), antecedent_support * (consequent_support - support))
+    zhangs_metric = leverage / denominator if denominator else math.nan
+    return (
+        frozenset([antecedent]), frozenset([consequent]), antecedent_support, consequent_support,
+        support, confidence, lift, leverage, conviction, zhangs_metric,
+    )
+
+
+def completed_order_baskets(since=None, chunk_size=2000):
+    """Yields (order id, order date, SKUs) for completed orders placed at or after `since`, streamed in chunks."""
+    from admin_panel.models import OrderItem
+
+    items = OrderItem.objects.filter(order_id__status='COMPLETED')
+    if since is not None:
+        items = items.filter(order_id__order_date__gte=since)
+    rows = (
+        items.order_by('order_id_id')
+        .values_list('order_id_id', 'order_id__order_date', 'product_id')
+        .iterator(chunk_size=chunk_size)
+    )
+    for (order_id, order_date), items in groupby(rows, key=lambda row: row[:2]):
+        yield order_id, order_date, [sku for _, _, sku in items]
+
+
+def load_counts(path):
+    import joblib
+
+    if not os.path.exists(path):
+        return SupportCounts()
+    counts = joblib.load(path)
+    if not hasattr(counts, 'counted_until'):
+        # Saved before the order_date mark: its set of order ids can't be
+        # turned into one, so count everything again.
+        return SupportCounts()
+    return counts
+
+
+def dump_atomic(value, path):
+    """Writes a joblib file next to `path` and renames it into place.
+
+    Readers (and the model registry's reload check) never see a partially
+    written file.
+    """
+    import joblib
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.joblib')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            joblib.dump(value, f)
+        # mkstemp creates the file 0600; keep the mode of the file being replaced.
+        os.chmod(tmp_path, os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,65 @@
+import hashlib
+import json
+import threading
+import time
+
+
+class SessionCache:
+    """Keeps one computed value per session, reused while its inputs are unchanged.
+
+    The value is stored in the session under `session_key` together with a
+    hash of the inputs it was computed from and an expiry time. Hit and miss
+    counters are shared by all sessions of this process.
+    """
+
+    def __init__(self, session_key, ttl=60):
+        self.session_key = session_key
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.changed = 0
+
+    @staticmethod
+    def input_hash(inputs):
+        data = json.dumps(inputs, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha1(data.encode()).hexdigest()
+
+    def get_or_compute(self, request, inputs, compute):
+        key = self.input_hash(inputs)
+        now = time.time()
+        entry = request.session.get(self.session_key)
+        if entry is not None and entry['key'] == key and entry['expires'] > now:
+            self._count('hits')
+            return entry['value']
+
+        if entry is None:
+            self._count('misses')
+        elif entry['key'] != key:
+            self._count('changed')
+        else:
+            self._count('expired')
+
+        value = compute()
+        if self.ttl > 0:
+            request.session[self.session_key] = {'key': key, 'expires': now + self.ttl, 'value': value}
+        return value
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self):
+        with self._lock:
+            # A changed or expired entry is recomputed, so it is a miss too.
+            misses = self.misses + self.changed + self.expired
+            lookups = self.hits + misses
+            return {
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': misses,
+                'changed_inputs': self.changed,
+                'expired': self.expired,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
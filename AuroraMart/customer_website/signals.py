@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+
+from admin_panel.models import Category, Product
+
+from . import price_snapshot, product_search
+from .autocomplete import invalidate_prefix_index, product_deleted, product_saved
+from .catalog_cache import invalidate_catalog_snapshot
+from .facets import invalidate_facet_index
+from .fragment_cache import bump_catalog_version
+
+for model in (Product, Category):
+    post_save.connect(invalidate_catalog_snapshot, sender=model, dispatch_uid=f'catalog_snapshot_save_{model.__name__}')
+    post_delete.connect(invalidate_catalog_snapshot, sender=model, dispatch_uid=f'catalog_snapshot_delete_{model.__name__}')
+    # Category moves and deletes change products' category paths.
+    post_save.connect(invalidate_facet_index, sender=model, dispatch_uid=f'facet_index_save_{model.__name__}')
+    post_delete.connect(invalidate_facet_index, sender=model, dispatch_uid=f'facet_index_delete_{model.__name__}')
+    post_save.connect(bump_catalog_version, sender=model, dispatch_uid=f'catalog_version_save_{model.__name__}')
+    post_delete.connect(bump_catalog_version, sender=model, dispatch_uid=f'catalog_version_delete_{model.__name__}')
+
+post_save.connect(product_saved, sender=Product, dispatch_uid='autocomplete_product_save')
+post_delete.connect(product_deleted, sender=Product, dispatch_uid='autocomplete_product_delete')
+post_save.connect(invalidate_prefix_index, sender=Category, dispatch_uid='autocomplete_category_save')
+post_delete.connect(invalidate_prefix_index, sender=Category, dispatch_uid='autocomplete_category_delete')
+
+post_save.connect(price_snapshot.product_saved, sender=Product, dispatch_uid='price_snapshot_product_save')
+post_delete.connect(price_snapshot.product_deleted, sender=Product, dispatch_uid='price_snapshot_product_delete')
+
+# The full-text index rows hold the product's name, description and category names.
+post_save.connect(product_search.product_saved, sender=Product, dispatch_uid='product_search_product_save')
+post_delete.connect(product_search.product_deleted, sender=Product, dispatch_uid='product_search_product_delete')
+post_save.connect(product_search.category_saved, sender=Category, dispatch_uid='product_search_category_save')
+pre_delete.connect(product_search.category_deleting, sender=Category, dispatch_uid='product_search_category_deleting')
+post_delete.connect(product_search.category_deleted, sender=Category, dispatch_uid='product_search_category_delete')
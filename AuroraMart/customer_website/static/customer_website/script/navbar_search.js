@@ -65,7 +65,7 @@ function performNavbarSearch(query) {
         </div>
     `;
     
-    fetch(`/search/ajax/?q=${encodeURIComponent(query)}`)
+    fetch(`/search/ajax/?mode=autocomplete&q=${encodeURIComponent(query)}`)
         .then(response => response.json())
         .then(data => {
             displaySearchResults(data);
@@ -102,7 +102,7 @@ function displaySearchResults(data) {
                 </div>
                 <div class="result-details">
                     <h4 class="result-name">${product.name}</h4>
-                    <p class="result-description">${product.description}</p>
+                    ${product.description ? `<p class="result-description">${product.description}</p>` : ''}
                     <div class="result-meta">
                         ${product.category ? `<span class="result-category">${product.category}</span>` : ''}
                         <span class="result-price">${product.currency_symbol}${product.price}</span>
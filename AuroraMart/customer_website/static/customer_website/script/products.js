@@ -37,6 +37,7 @@ function performSearch() {
     
     // Reset to first page when searching
     currentUrl.searchParams.delete('page');
+    currentUrl.searchParams.delete('cursor');
     
     window.location.href = currentUrl.toString();
 }
@@ -48,6 +49,7 @@ function clearSearch() {
         const currentUrl = new URL(window.location.href);
         currentUrl.searchParams.delete('search');
         currentUrl.searchParams.delete('page');
+        currentUrl.searchParams.delete('cursor');
         window.location.href = currentUrl.toString();
     }
 }
@@ -65,6 +67,7 @@ function performSort(sortType) {
     const currentUrl = new URL(window.location.href);
     currentUrl.searchParams.set('sort', sortType);
     currentUrl.searchParams.delete('page');
+    currentUrl.searchParams.delete('cursor');
     
     window.location.href = currentUrl.toString();
 }
@@ -104,6 +107,7 @@ function filterByCategory(category) {
     }
     
     currentUrl.searchParams.delete('page');
+    currentUrl.searchParams.delete('cursor');
     
     console.log('New URL will be:', currentUrl.toString()); 
     window.location.href = currentUrl.toString();
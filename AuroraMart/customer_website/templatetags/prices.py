@@ -0,0 +1,11 @@
+from django import template
+
+from customer_website.price_snapshot import product_price
+
+register = template.Library()
+
+
+@register.filter
+def price(product, currency_info):
+    """{{ product|price:currency_info }}: the product's price in the display currency."""
+    return product_price(product, currency_info)
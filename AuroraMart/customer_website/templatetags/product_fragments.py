@@ -0,0 +1,34 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from customer_website.fragment_cache import fragment_cache
+
+register = template.Library()
+
+
+class CachedFragmentNode(template.Node):
+    def __init__(self, nodelist, name, parts):
+        self.nodelist = nodelist
+        self.name = name
+        self.parts = parts
+
+    def render(self, context):
+        parts = tuple(part.resolve(context) for part in self.parts)
+        return mark_safe(fragment_cache.get_or_render(self.name, parts, lambda: self.nodelist.render(context)))
+
+
+@register.tag
+def cached_fragment(parser, token):
+    """{% cached_fragment "name" key_part ... %}...{% endcached_fragment %}
+
+    Renders the block once per distinct name, key parts and catalog
+    version; the key parts must cover everything the block depends on.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' needs a fragment name")
+    name = bits[1].strip('"\'')
+    parts = [parser.compile_filter(bit) for bit in bits[2:]]
+    nodelist = parser.parse(('endcached_fragment',))
+    parser.delete_first_token()
+    return CachedFragmentNode(nodelist, name, parts)
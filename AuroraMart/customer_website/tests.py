@@ -1,3 +1,587 @@
-from django.test import TestCase
+import os
+import socket
+import tempfile
+import threading
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import transaction
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from admin_panel.models import Category, Product
+
+from . import autocomplete, background_prediction, price_snapshot
+from .autocomplete import PrefixIndex, Suggestion
+from .background_prediction import PENDING_SESSION_KEY, predict_preferred_category_later, refresh_pending_category
+from .fragment_cache import get_catalog_version
+from .inference_server import InferenceClient, InferenceServer, InferenceUnavailable
+from .models import Customer
+from .numpy_predictor import NumpyClassifier, UnsupportedModel, export_classifier
+from .pagination import SORT_ORDERS, InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from .price_snapshot import CURRENCIES, convert_amount, get_price_snapshot, product_price
+from .product_search import index_products, ranked_skus, search_products
+
+
+# The suite clears the cache; keep it away from the dev server's shared one.
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class NumpyClassifierTests(SimpleTestCase):
+    """NumpyClassifier must predict exactly what the exported sklearn model predicts."""
+
+    def setUp(self):
+        import numpy as np
+
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(size=(400, 6))
+        self.y = np.array(['Books', 'Electronics', 'Fashion'])[
+            (self.X[:, 0] + self.X[:, 1] > 0).astype(int) + (self.X[:, 2] > 1)
+        ]
+        # Rows the models were not fitted on, including values far outside the training range.
+        self.X_test = rng.normal(scale=3, size=(1000, 6))
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'classifier.npz')
+
+    def export(self, model):
+        export_classifier(model, self.path)
+        return NumpyClassifier.load(self.path)
+
+    def assertSamePredictions(self, model, X):
+        import numpy as np
+
+        exported = self.export(model)
+        np.testing.assert_array_equal(exported.predict(X), model.predict(X))
+        if hasattr(model, 'tree_') or hasattr(model, 'estimators_'):
+            np.testing.assert_array_equal(exported.predict_proba(X), model.predict_proba(X))
+
+    def test_decision_tree(self):
+        from sklearn.tree import DecisionTreeClassifier
+
+        model = DecisionTreeClassifier(max_depth=6, random_state=0).fit(self.X, self.y)
+        self.assertSamePredictions(model, self.X_test)
+
+    def test_decision_tree_with_missing_values(self):
+        import numpy as np
+        from sklearn.tree import DecisionTreeClassifier
+
+        X = self.X.copy()
+        X[::7, 0] = np.nan
+        X_test = self.X_test.copy()
+        X_test[::5, 0] = np.nan
+        model = DecisionTreeClassifier(random_state=0).fit(X, self.y)
+        self.assertSamePredictions(model, X_test)
+
+    def test_random_forest(self):
+        from sklearn.ensemble import RandomForestClassifier
+
+        model = RandomForestClassifier(n_estimators=15, max_depth=5, random_state=0).fit(self.X, self.y)
+        self.assertSamePredictions(model, self.X_test)
+
+    def test_logistic_regression(self):
+        from sklearn.linear_model import LogisticRegression
+
+        model = LogisticRegression(max_iter=1000).fit(self.X, self.y)
+        self.assertSamePredictions(model, self.X_test)
+
+    def test_binary_linear_model(self):
+        from sklearn.linear_model import LogisticRegression
+
+        model = LogisticRegression().fit(self.X, self.X[:, 0] > 0)
+        self.assertSamePredictions(model, self.X_test)
+
+    def test_feature_names_are_kept(self):
+        import pandas as pd
+        from sklearn.tree import DecisionTreeClassifier
+
+        columns = [f'feature_{i}' for i in range(self.X.shape[1])]
+        model = DecisionTreeClassifier(random_state=0).fit(pd.DataFrame(self.X, columns=columns), self.y)
+        self.assertEqual(list(self.export(model).feature_names_in_), columns)
+
+    def test_unsupported_model(self):
+        from sklearn.neighbors import KNeighborsClassifier
+
+        with self.assertRaises(UnsupportedModel):
+            export_classifier(KNeighborsClassifier().fit(self.X, self.y), self.path)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Few distinct names, prices and ratings, so that pages split runs of equal sort values.
+        for i in range(47):
+            Product.objects.create(
+                sku=f'SKU-{(i * 17) % 47:03d}', product_name=f'Product {i % 5}', description='',
+                unit_price=Decimal(i % 4) + Decimal('0.99'), product_rating=float(i % 3),
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def expected(self, sort_by):
+        field, descending = SORT_ORDERS[sort_by]
+        rows = sorted(Product.objects.values_list(field, 'sku'), reverse=descending)
+        return [sku for _, sku in rows]
+
+    def walk_forward(self, sort_by, per_page):
+        pages, cursor = [], None
+        while True:
+            page = keyset_page(Product.objects.all(), sort_by, cursor, per_page=per_page)
+            pages.append(page)
+            if not page.has_next:
+                return pages
+            cursor = page.next_cursor
+
+    def test_forward_pages_follow_the_sort_order(self):
+        for sort_by in SORT_ORDERS:
+            with self.subTest(sort_by=sort_by):
+                pages = self.walk_forward(sort_by, per_page=6)
+                self.assertEqual([p.sku for page in pages for p in page], self.expected(sort_by))
+                self.assertFalse(pages[0].has_previous)
+                self.assertTrue(all(len(page) == 6 for page in pages[:-1]))
+
+    def test_previous_cursors_give_back_the_same_pages(self):
+        for sort_by in SORT_ORDERS:
+            with self.subTest(sort_by=sort_by):
+                forward = self.walk_forward(sort_by, per_page=6)
+                page = forward[-1]
+                for expected in reversed(forward[:-1]):
+                    self.assertTrue(page.has_previous)
+                    page = keyset_page(Product.objects.all(), sort_by, page.previous_cursor, per_page=6)
+                    self.assertEqual([p.sku for p in page], [p.sku for p in expected])
+                    self.assertTrue(page.has_next)
+                self.assertFalse(page.has_previous)
+
+    def test_filtered_queryset(self):
+        queryset = Product.objects.filter(product_rating=1.0)
+        page = keyset_page(queryset, 'price-desc', per_page=100)
+        self.assertEqual({p.sku for p in page}, set(queryset.values_list('sku', flat=True)))
+        self.assertFalse(page.has_next)
+        self.assertIsNone(page.next_cursor)
+
+    def test_invalid_cursor_gives_the_first_page(self):
+        first = keyset_page(Product.objects.all(), 'name-asc', per_page=5)
+        for cursor in ('not a cursor', encode_cursor('x', 'SKU-001')[:-3], '!!!'):
+            with self.subTest(cursor=cursor):
+                page = keyset_page(Product.objects.all(), 'name-asc', cursor, per_page=5)
+                self.assertEqual([p.sku for p in page], [p.sku for p in first])
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor(Decimal('12.50'), 'SKU-&/+', backwards=True)
+        self.assertEqual(decode_cursor(cursor, 'unit_price'), (Decimal('12.50'), 'SKU-&/+', True))
+        with self.assertRaises(InvalidCursor):
+            decode_cursor(encode_cursor('abc', 'SKU-1'), 'unit_price')
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.kitchen = Category.objects.create(category_id='CAT-1', name='Kitchen')
+        self.product('SKU-1', 'Steel kettle', 'Boils water quickly.')
+        self.product('SKU-2', 'Teapot', 'Pairs well with a steel kettle.')
+        self.product('SKU-3', 'Garden hose', 'Twenty metres.', category=None)
+
+    def product(self, sku, name, description, **fields):
+        fields.setdefault('category', self.kitchen)
+        return Product.objects.create(
+            sku=sku, product_name=name, description=description, unit_price=Decimal('10.00'), **fields,
+        )
+
+    def search(self, query):
+        return sorted(search_products(Product.objects.all(), query).values_list('sku', flat=True))
+
+    def test_words_and_prefixes(self):
+        self.assertEqual(self.search('kettle'), ['SKU-1', 'SKU-2'])
+        self.assertEqual(self.search('ket'), ['SKU-1', 'SKU-2'])
+        self.assertEqual(self.search('steel kett'), ['SKU-1', 'SKU-2'])
+        self.assertEqual(self.search('hose metres'), ['SKU-3'])
+        self.assertEqual(self.search('ladder'), [])
+
+    def test_category_names_are_searched(self):
+        self.assertEqual(self.search('kitchen'), ['SKU-1', 'SKU-2'])
+
+    def test_name_matches_rank_first(self):
+        ranked = search_products(Product.objects.all(), 'kettle', ranked=True)
+        self.assertEqual([p.sku for p in ranked], ['SKU-1', 'SKU-2'])
+        self.assertEqual(ranked_skus('kettle'), ['SKU-1', 'SKU-2'])
+        self.assertEqual(ranked_skus('kettle', limit=1), ['SKU-1'])
+
+    def test_search_syntax_is_taken_literally(self):
+        for query in ('(kettle', '"kettle', '-kettle', 'kettle*', 'kettle ^', 'kettle: +'):
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query), ['SKU-1', 'SKU-2'])
+        # Operators are words like any other.
+        self.assertEqual(self.search('kettle AND teapot'), [])
+        self.assertEqual(self.search('***'), [])
+
+    def test_saves_update_the_index(self):
+        kettle = Product.objects.get(pk='SKU-1')
+        kettle.product_name = 'Copper jug'
+        kettle.save()
+        self.assertEqual(self.search('copper'), ['SKU-1'])
+        self.assertEqual(self.search('kettle'), ['SKU-2'])
+
+        kettle.delete()
+        self.assertEqual(self.search('copper'), [])
+
+    def test_saves_of_other_fields_skip_the_index(self):
+        kettle = Product.objects.get(pk='SKU-1')
+        kettle.quantity_on_hand = 3
+        # Only the UPDATE; the index is not rewritten.
+        with self.assertNumQueries(1):
+            kettle.save(update_fields=['quantity_on_hand'])
+        self.assertEqual(self.search('steel'), ['SKU-1', 'SKU-2'])
+
+    def test_category_renames_and_deletes_update_the_index(self):
+        self.kitchen.name = 'Cookware'
+        self.kitchen.save()
+        self.assertEqual(self.search('cookware'), ['SKU-1', 'SKU-2'])
+        self.assertEqual(self.search('kitchen'), [])
+
+        self.kitchen.delete()
+        self.assertEqual(self.search('cookware'), [])
+        self.assertEqual(self.search('kettle'), ['SKU-1', 'SKU-2'])
+
+    @override_settings(PRODUCT_KEYSET_PAGINATION=True)
+    def test_relevance_order_survives_keyset_pagination(self):
+        # First by name but not by relevance: "kettle" is only in its description.
+        self.product('SKU-0', 'Aardvark mug', 'Sits next to the kettle.')
+        session = self.client.session
+        session['customer_hasLogin'] = True
+        session.save()
+        response = self.client.get('/products/', {'search': 'kettle', 'sort': 'relevance'})
+        skus = [p.sku for p in response.context['products']]
+        self.assertEqual((skus[0], sorted(skus)), ('SKU-1', ['SKU-0', 'SKU-1', 'SKU-2']))
+        self.assertFalse(response.context['keyset'])
+
+        response = self.client.get('/products/', {'search': 'kettle', 'sort': 'name-asc'})
+        self.assertEqual([p.sku for p in response.context['products']], ['SKU-0', 'SKU-1', 'SKU-2'])
+        self.assertTrue(response.context['keyset'])
+
+    def test_index_products_after_bulk_create(self):
+        Product.objects.bulk_create([
+            Product(sku='SKU-4', product_name='Copper kettle', description='', unit_price=Decimal('5.00')),
+        ])
+        self.assertEqual(self.search('copper'), [])
+        index_products(['SKU-4'])
+        self.assertEqual(self.search('copper'), ['SKU-4'])
+
+
+class PrefixIndexTests(SimpleTestCase):
+    def suggestion(self, sku, name):
+        return Suggestion(sku, name, Decimal('1.00'), None, None)
+
+    def setUp(self):
+        self.index = PrefixIndex([
+            self.suggestion('SKU-1', 'Aurora Wireless Lamp'),
+            self.suggestion('SKU-2', 'Wireless Mouse'),
+            self.suggestion('SKU-3', 'Lamp shade'),
+        ])
+
+    def skus(self, query):
+        return sorted(s.sku for s in self.index.search(query))
+
+    def test_any_word_prefix_matches(self):
+        self.assertEqual(self.skus('wire'), ['SKU-1', 'SKU-2'])
+        self.assertEqual(self.skus('LAMP'), ['SKU-1', 'SKU-3'])
+        self.assertEqual(self.skus('wireless la'), ['SKU-1'])
+        self.assertEqual(self.skus(''), [])
+        self.assertEqual(len(self.index.search('lamp', limit=1)), 1)
+        self.assertEqual(self.index.search('lamp', limit=0), [])
+        self.assertEqual(self.index.search('lamp', limit=-3), [])
+
+    def test_add_replaces_and_remove_drops(self):
+        self.index.add(self.suggestion('SKU-2', 'Corded Mouse'))
+        self.assertEqual(self.skus('wire'), ['SKU-1'])
+        self.assertEqual(self.skus('cord'), ['SKU-2'])
+
+        self.index.remove('SKU-1')
+        self.assertEqual(self.skus('lamp'), ['SKU-3'])
+        self.assertEqual(len(self.index), 2)
+
+    def test_remove_missing_entries_quietly(self):
+        self.index.remove('SKU-404')
+        # An entry that is already gone from the sorted lists.
+        self.index.suggestions['SKU-3'] = self.suggestion('SKU-3', 'Zebra rug')
+        self.index.remove('SKU-3')
+        self.assertEqual(self.skus('lamp'), ['SKU-1'])
+
+    def test_changes_leave_the_entries_a_search_started_with(self):
+        keys, skus = self.index._entries
+        before = (list(keys), list(skus))
+        self.index.add(self.suggestion('SKU-4', 'Lamp post'))
+        self.index.remove('SKU-1')
+        self.assertEqual((keys, skus), before)
+        self.assertEqual(self.skus('lamp'), ['SKU-3', 'SKU-4'])
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CatalogVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(
+            sku='SKU-1', product_name='Kettle', description='', unit_price=Decimal('10.00'),
+        )
+        self.version = get_catalog_version()
+
+    def test_stock_updates_keep_the_version(self):
+        product = Product.objects.get(pk='SKU-1')
+        product.quantity_on_hand = 3
+        product.save(update_fields=['quantity_on_hand'])
+        version = get_catalog_version()
+        product.quantity_on_hand = 2
+        product.reorder_quantity = 5
+        product.save(update_fields=['quantity_on_hand', 'reorder_quantity'])
+        self.assertEqual(get_catalog_version(), version)
+
+    def test_selling_out_and_restocking_replace_it(self):
+        product = Product.objects.get(pk='SKU-1')
+        product.quantity_on_hand = 2
+        product.save(update_fields=['quantity_on_hand'])
+        for quantity in (0, 4):
+            with self.subTest(quantity=quantity):
+                version = get_catalog_version()
+                product.quantity_on_hand = quantity
+                product.save(update_fields=['quantity_on_hand'])
+                self.assertNotEqual(get_catalog_version(), version)
+
+    def test_sold_out_products_leave_the_in_stock_grid(self):
+        self.product.quantity_on_hand = 1
+        self.product.save()
+        session = self.client.session
+        session['customer_hasLogin'] = True
+        session.save()
+        self.assertContains(self.client.get('/products/?stock=1'), 'SKU: SKU-1')
+
+        # As checkout does it.
+        product = Product.objects.get(pk='SKU-1')
+        product.quantity_on_hand = 0
+        product.save(update_fields=['quantity_on_hand'])
+        self.assertNotContains(self.client.get('/products/?stock=1'), 'SKU: SKU-1')
+
+    def test_other_writes_replace_it(self):
+        self.product.unit_price = Decimal('12.00')
+        self.product.save(update_fields=['unit_price', 'quantity_on_hand'])
+        self.assertNotEqual(get_catalog_version(), self.version)
+
+        version = get_catalog_version()
+        self.product.save()
+        self.assertNotEqual(get_catalog_version(), version)
+
+        version = get_catalog_version()
+        self.product.delete()
+        self.assertNotEqual(get_catalog_version(), version)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class PriceSnapshotTests(TestCase):
+    PRICES = ('0.01', '0.05', '1.15', '7.15', '19.99', '33.33', '249.50', '1234.56')
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(price_snapshot, '_snapshot', (None, None, 0.0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for i, unit_price in enumerate(self.PRICES):
+            Product.objects.create(sku=f'SKU-{i}', product_name='Kettle', description='', unit_price=Decimal(unit_price))
+
+    def old_price(self, unit_price, currency_info):
+        # What convert_product_prices and convert_cart_prices used to compute.
+        if isinstance(unit_price, float):
+            unit_price = Decimal(str(unit_price))
+        return (unit_price * currency_info['rate']).quantize(Decimal('0.01'))
+
+    def test_prices_match_the_old_conversion(self):
+        template = Template('{% load prices %}{{ product|price:currency_info }}')
+        for code, currency_info in CURRENCIES.items():
+            for product in Product.objects.all():
+                with self.subTest(code=code, sku=product.sku):
+                    unit_price = product.unit_price
+                    expected = self.old_price(unit_price, currency_info)
+                    self.assertEqual(str(product_price(product, currency_info)), str(expected))
+                    rendered = template.render(Context({'product': product, 'currency_info': currency_info}))
+                    self.assertEqual(rendered, str(expected))
+                    # The product itself is not converted.
+                    self.assertEqual(product.unit_price, unit_price)
+
+    def test_cart_amounts_match_the_old_conversion(self):
+        for code, currency_info in CURRENCIES.items():
+            for unit_price in self.PRICES:
+                with self.subTest(code=code, unit_price=unit_price):
+                    amount = float(unit_price)
+                    self.assertEqual(str(convert_amount(amount, currency_info)), str(self.old_price(amount, currency_info)))
+
+    def test_saves_and_deletes_patch_the_snapshot(self):
+        snapshot = get_price_snapshot()
+        product = Product.objects.get(pk='SKU-1')
+        product.unit_price = Decimal('2.50')
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(product_price(product, CURRENCIES['JPY']), Decimal('276.25'))
+        self.assertIs(get_price_snapshot(), snapshot)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertIsNone(snapshot.lookup('SKU-1', 'SGD'))
+        with self.captureOnCommitCallbacks(execute=True):
+            created = Product.objects.create(
+                sku='SKU-NEW', product_name='Mug', description='', unit_price=Decimal('3.00'),
+            )
+        self.assertEqual(snapshot.lookup('SKU-NEW', 'USD'), 222)
+        self.assertEqual(product_price(created, CURRENCIES['USD']), Decimal('2.22'))
+
+    def test_rolled_back_changes_are_not_patched_in(self):
+        snapshot = get_price_snapshot()
+        version = cache.get(price_snapshot.VERSION_KEY)
+        product = Product.objects.get(pk='SKU-1')
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                product.unit_price = Decimal('2.50')
+                product.save()
+                transaction.set_rollback(True)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(snapshot.lookup('SKU-1', 'SGD'), 5)
+        self.assertEqual(cache.get(price_snapshot.VERSION_KEY), version)
+
+    def test_stock_updates_leave_the_snapshot_alone(self):
+        get_price_snapshot()
+        version = cache.get(price_snapshot.VERSION_KEY)
+        product = Product.objects.get(pk='SKU-1')
+        product.quantity_on_hand = 3
+        product.save(update_fields=['quantity_on_hand'])
+        self.assertEqual(cache.get(price_snapshot.VERSION_KEY), version)
+
+    def test_other_processes_rebuild(self):
+        snapshot = get_price_snapshot()
+        # Another process changed a price.
+        cache.set(price_snapshot.VERSION_KEY, 'elsewhere')
+        Product.objects.filter(pk='SKU-1').update(unit_price=Decimal('9.00'))
+        with mock.patch.object(price_snapshot, 'CHECK_INTERVAL', 0):
+            rebuilt = get_price_snapshot()
+        self.assertIsNot(rebuilt, snapshot)
+        self.assertEqual(rebuilt.lookup('SKU-1', 'SGD'), 900)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class AutocompleteViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for i in range(25):
+            Product.objects.create(sku=f'SKU-{i:02d}', product_name=f'Lamp {i}', description='', unit_price=Decimal('1.00'))
+        session = self.client.session
+        session['customer_hasLogin'] = True
+        session.save()
+
+    def results(self, limit):
+        response = self.client.get('/search/ajax/', {'q': 'lamp', 'mode': 'autocomplete', 'limit': limit})
+        return response.json()['results']
+
+    def test_only_committed_renames_are_suggested(self):
+        patcher = mock.patch.object(autocomplete, '_index', (None, None))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.assertEqual(len(self.results(20)), 20)
+        product = Product.objects.get(pk='SKU-00')
+        with transaction.atomic():
+            product.product_name = 'Zebra rug'
+            product.save()
+            transaction.set_rollback(True)
+        self.assertEqual(self.client.get('/search/ajax/', {'q': 'zebra', 'mode': 'autocomplete'}).json()['results'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        results = self.client.get('/search/ajax/', {'q': 'zebra', 'mode': 'autocomplete'}).json()['results']
+        self.assertEqual([result['sku'] for result in results], ['SKU-00'])
+
+    def test_limit_is_clamped(self):
+        for limit, expected in (('3', 3), ('0', 1), ('-3', 1), ('100', 20), ('many', 8)):
+            with self.subTest(limit=limit):
+                self.assertEqual(len(self.results(limit)), expected)
+
+
+class InferenceServerTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'inference.sock')
+
+    def serve(self, **options):
+        server = InferenceServer(self.path, **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_stale_socket_is_replaced(self):
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.path)
+        stale.close()
+        self.serve()
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_other_files_are_left_alone(self):
+        with open(self.path, 'w') as f:
+            f.write('keep me')
+        with self.assertRaises(OSError):
+            InferenceServer(self.path)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), 'keep me')
+
+    def test_a_listening_server_is_left_alone(self):
+        self.serve()
+        with self.assertRaises(OSError):
+            InferenceServer(self.path)
+
+    def test_stuck_calls_time_out(self):
+        server = self.serve(call_timeout=0.05)
+        # Nothing ever processes the queued calls.
+        server.calls = mock.Mock()
+        client = InferenceClient(self.path, timeout=2)
+        with self.assertRaisesMessage(InferenceUnavailable, 'timed out'):
+            client.recommend(['SKU-1'])
+        client._disconnect()
+
+
+@override_settings(CACHES=TEST_CACHES)
+class BackgroundPredictionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = Customer.objects.create(username='ada', password='x')
+        self.request = mock.Mock(session={})
+        # Submitted predictions run only when predict() says so, as if the worker were slow.
+        self.submitted = []
+        executor = mock.Mock(submit=lambda fn, *args: self.submitted.append((fn, args)))
+        for target, value in (('get_executor', lambda: executor), ('connection', mock.Mock())):
+            patcher = mock.patch.object(background_prediction, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def predict(self, category):
+        predict_preferred_category_later(self.request, self.customer, {'age': 30})
+        with mock.patch('customer_website.views.predict_preferred_category', return_value=[category]):
+            for fn, args in self.submitted:
+                fn(*args)
+        self.submitted.clear()
+        self.customer.refresh_from_db()
+
+    def test_pending_until_the_prediction_lands(self):
+        predict_preferred_category_later(self.request, self.customer, {'age': 30})
+        refresh_pending_category(self.request, self.customer)
+        self.assertIn(PENDING_SESSION_KEY, self.request.session)
+        self.assertNotIn('preferred_category', self.request.session)
+
+    def test_a_predicted_provisional_category_ends_the_wait(self):
+        self.predict('General')
+        refresh_pending_category(self.request, self.customer)
+        self.assertNotIn(PENDING_SESSION_KEY, self.request.session)
+        self.assertEqual(self.request.session['preferred_category'], 'General')
+
+    def test_other_categories_are_copied_into_the_session(self):
+        self.predict('Books')
+        refresh_pending_category(self.request, self.customer)
+        self.assertEqual(self.request.session['preferred_category'], 'Books')
@@ -1,7 +1,8 @@
 import os
+import random
 import uuid
-import joblib
 from datetime import datetime, timedelta
+from urllib.parse import urlencode
 from decimal import Decimal
 
 from django.shortcuts import render, redirect
@@ -9,18 +10,31 @@ from django.urls import reverse
 from django.views import View
 from django.http import JsonResponse
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
 from django.core.mail import send_mail
 from django.core.paginator import Paginator
 from django.contrib.auth.hashers import check_password
-from django.db.models import Case, When, Value, IntegerField, Sum, Q
+from django.db.models import Case, When, Value, IntegerField, Q
 from django.conf import settings
 
-import pandas as pd
-
 from admin_panel.models import Product, Category, Order, OrderItem, Review, Coupon, CouponUsage
 from admin_panel.forms import ReviewForm 
-
-from .models import Customer, Wishlist
+from admin_panel.category_tree import get_category_tree
+
+from .models import Customer, Wishlist, ProductRecommendation
+from .autocomplete import get_prefix_index
+from .background_prediction import predict_preferred_category_later, refresh_pending_category
+from .catalog_cache import get_catalog_snapshot, sample_category_products
+from .facets import FACETS, facet_counts, facet_filters, facet_options, get_facet_index, grouped_counts
+from .feature_encoding import FeatureEncoder
+from .inference_server import InferenceClient, InferenceUnavailable
+from .model_registry import ModelRegistry, load_joblib, load_joblib_mmap
+from .numpy_predictor import NumpyClassifier
+from .pagination import approximate_count, keyset_page
+from .price_snapshot import CURRENCIES, DEFAULT_CURRENCY, convert_amount, product_price
+from .product_search import search_products
+from .recommendations import RecommendationCache, load_mapped_rule_store, load_rule_store
+from .session_cache import SessionCache
 from .forms import (
     CustomerLoginForm, CustomerSignupForm, CustomerForm,
     CheckoutForm, ForgotPasswordForm, ResetPasswordForm, ReviewForm
@@ -39,33 +53,15 @@ def get_currency_context(request):
     else:
         selected_currency = request.session.get('selected_currency', 'SGD')
     
-    currency_rates = {
-        'SGD': {'rate': Decimal('1.0'), 'symbol': 'S$'},
-        'USD': {'rate': Decimal('0.74'), 'symbol': '$'},
-        'EUR': {'rate': Decimal('0.68'), 'symbol': '€'},
-        'JPY': {'rate': Decimal('110.5'), 'symbol': '¥'},
-        'GBP': {'rate': Decimal('0.58'), 'symbol': '£'}
-    }
-    
-    currency_info = currency_rates.get(selected_currency, currency_rates['SGD'])
+    currency_info = CURRENCIES.get(selected_currency, CURRENCIES[DEFAULT_CURRENCY])
     return {
         'selected_currency': selected_currency,
         'currency_info': currency_info,
         'currency_symbol': currency_info['symbol'],
-        'currency_rates': currency_rates
+        'currency_rates': CURRENCIES
     }
 
 
-def convert_product_prices(products, currency_info):
-    for product in products:
-        converted_price = product.unit_price * currency_info['rate']
-        product.unit_price = converted_price.quantize(Decimal('0.01'))
-    return products
-
-def convert_cart_prices(product, currency_info):
-    converted_price = Decimal(str(product)) * currency_info['rate']
-    return converted_price.quantize(Decimal('0.01'))
- 
 def get_cart_count(request):
     cart = request.session.get('cart', {})
     return len(cart)
@@ -85,6 +81,7 @@ class BaseView(View):
             try:
                 customer = Customer.objects.get(username=username)
                 wishlist_count = Wishlist.objects.filter(customer=customer).count()
+                refresh_pending_category(request, customer)
             except Customer.DoesNotExist:
                 wishlist_count = 0
         else:
@@ -106,101 +103,160 @@ class BaseView(View):
         return render(request, template_name, merged)
     
 model_path = os.path.join(os.path.dirname(__file__), 'prediction_data', 'b2c_customers_100.joblib')
-try:
-    preferred_model = joblib.load(model_path)
-except Exception as e:
-    preferred_model = None
+loaded_path = os.path.join(os.path.dirname(__file__), 'prediction_data', 'b2c_products_500_transactions_50k.joblib')
+numpy_model_path = os.path.join(os.path.dirname(__file__), 'prediction_data', 'b2c_customers_100.npz')
+
+mmap_dir = getattr(settings, 'ML_MMAP_DIR', os.path.join(os.path.dirname(__file__), 'prediction_data', 'mmap'))
+
+model_registry = ModelRegistry(check_interval=getattr(settings, 'MODEL_RELOAD_INTERVAL', 30))
+if getattr(settings, 'ML_MMAP_ARTIFACTS', False):
+    # Written by `manage.py export_mmap_artifacts`.
+    model_registry.register('classifier', os.path.join(mmap_dir, 'classifier.joblib'), load_joblib_mmap)
+    model_registry.register('rules', os.path.join(mmap_dir, 'rules.json'), load_mapped_rule_store)
+else:
+    model_registry.register('classifier', model_path, load_joblib)
+    model_registry.register('rules', loaded_path, load_rule_store)
+if getattr(settings, 'ML_NUMPY_CLASSIFIER', False):
+    # Written by `manage.py export_numpy_classifier`; serving it never imports sklearn.
+    model_registry.register('classifier', numpy_model_path, NumpyClassifier.load)
+
+def get_preferred_model():
+    try:
+        return model_registry.get('classifier')
+    except Exception:
+        return None
+
+def get_rule_store():
+    return model_registry.get('rules')
+
+def warm_up_models(background=False):
+    """Loads the ML artifacts ahead of the first request that needs them."""
+    return model_registry.warm_up(background=background)
+
+_feature_encoder = (None, None)
+
+def get_feature_encoder(model):
+    """The FeatureEncoder for the given model, rebuilt when the model is reloaded."""
+    global _feature_encoder
+    encoder_model, encoder = _feature_encoder
+    if encoder_model is not model:
+        encoder = FeatureEncoder.for_model(model)
+        _feature_encoder = (model, encoder)
+    return encoder
+
+# Set INFERENCE_SOCKET to use the sidecar started by `manage.py run_inference_server`.
+inference_client = (
+    InferenceClient(settings.INFERENCE_SOCKET, timeout=getattr(settings, 'INFERENCE_TIMEOUT', 0.5))
+    if getattr(settings, 'INFERENCE_SOCKET', None) else None
+)
 
 def predict_preferred_category(customer_data):
+    if inference_client is not None:
+        try:
+            return inference_client.predict(customer_data)
+        except InferenceUnavailable:
+            pass
+    return local_predict_preferred_category(customer_data)
+
+def local_predict_preferred_category(customer_data):
+    preferred_model = get_preferred_model()
     if preferred_model is None:
         return []
-    columns = {
-        'age':'int64', 'household_size':'int64', 'has_children':'int64', 'monthly_income_sgd':'float64',
-        'gender_Female':'bool', 'gender_Male':'bool', 'employment_status_Full-time':'bool',
-        'employment_status_Part-time':'bool', 'employment_status_Retired':'bool',
-        'employment_status_Self-employed':'bool', 'employment_status_Student':'bool',
-        'occupation_Admin':'bool', 'occupation_Education':'bool', 'occupation_Sales':'bool',
-        'occupation_Service':'bool', 'occupation_Skilled Trades':'bool', 'occupation_Tech':'bool',
-        'education_Bachelor':'bool', 'education_Diploma':'bool', 'education_Doctorate':'bool',
-        'education_Master':'bool', 'education_Secondary':'bool'
-    }
-
-    df = pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in columns.items()})
-    customer_df = pd.DataFrame([customer_data])
-    customer_encoded = pd.get_dummies(customer_df, columns=['gender', 'employment_status', 'occupation', 'education'])    
-
-    for col in df.columns:
-
-        if col not in customer_encoded.columns:
-
-            if df[col].dtype == bool:
-                df[col] = False
-            else:
-                df[col] = 0
-        
-        else:
 
-            df[col] = customer_encoded[col]
-    
-    prediction = preferred_model.predict(df)
+    encoder = get_feature_encoder(preferred_model)
+    return encoder.predict(preferred_model, encoder.encode(customer_data))
 
-    return prediction
+recommendation_cache = RecommendationCache(maxsize=getattr(settings, 'RECOMMENDATION_CACHE_SIZE', 1024))
 
-loaded_path = os.path.join(os.path.dirname(__file__), 'prediction_data', 'b2c_products_500_transactions_50k.joblib')
-loaded_rules = joblib.load(loaded_path)
 def get_recommendations(items, metric='confidence', top_n=5):
-    mask = loaded_rules['antecedents'].apply(lambda x: any(item in x for item in items))
-    relevant_rules = loaded_rules[mask]
-    if len(relevant_rules) == 0:
-        return []
-    
-    sorted_rules = relevant_rules.sort_values(by=metric, ascending=False)
-    
-    recommendations = set()
-    for _, row in sorted_rules.head(top_n * 3).iterrows(): 
-        recommendations.update(row['consequents'])
-    
-    recommendations.difference_update(items)
-    return list(recommendations)[:top_n]
-
+    if inference_client is not None:
+        try:
+            return inference_client.recommend(items, metric=metric, top_n=top_n)
+        except InferenceUnavailable:
+            pass
+    return local_recommendations(items, metric=metric, top_n=top_n)
+
+def local_recommendations(items, metric='confidence', top_n=5):
+    return recommendation_cache.recommend(get_rule_store(), items, metric=metric, top_n=top_n)
+
+def frequently_bought_together(sku, top_n=4):
+    """Products bought with `sku`, from `manage.py build_recommendations` when its rows are current.
+
+    Rows computed from rules other than the loaded ones (or none at all, e.g.
+    right after a reload or `mine_rules --install`) give way to the live rules.
+    """
+    metric = getattr(settings, 'FREQUENTLY_BOUGHT_TOGETHER_METRIC', 'confidence')
+    rows = ProductRecommendation.objects.filter(sku=sku, metric=metric, rank__lt=top_n)
+    try:
+        loaded = model_registry.get_loaded('rules')
+    except Exception:
+        # No rules to compare with or fall back to: use what was precomputed.
+        return [row.recommended_product for row in rows.select_related('recommended_product')]
+
+    products = [
+        row.recommended_product
+        for row in rows.filter(rules_version=loaded.version).select_related('recommended_product')
+    ]
+    if products:
+        return products
+    # Ranked the way build_recommendations ranks the rows it stores.
+    skus = [rec_sku for rec_sku, _ in loaded.value.scored_recommendations([sku], metric=metric, top_n=top_n)]
+    found = Product.objects.in_bulk(skus) if skus else {}
+    return [found[rec_sku] for rec_sku in skus if rec_sku in found]
+
+
+# Next best actions only depend on these inputs, so they are reused while
+# the customer pages through the same listing.
+next_best_action_cache = SessionCache('next_best_action', ttl=getattr(settings, 'NEXT_BEST_ACTION_TTL', 60))
 
 def get_next_best_action(request, current_category=None):
+    inputs = {
+        'preferred_category': request.session.get('preferred_category'),
+        'browsing_history': sorted(request.session.get('browsing_history', [])),
+        'cart': sorted(request.session.get('cart', {})),
+        'current_category': current_category,
+    }
+    return next_best_action_cache.get_or_compute(
+        request, inputs, lambda: compute_next_best_action(request, current_category),
+    )
+
+def compute_next_best_action(request, current_category=None):
     actions = []
     
     try:
         preferred_category = request.session.get('preferred_category')
         browsing_history = request.session.get('browsing_history', [])
         
+        # Counts, reorder totals and SKU -> category all come from one cached
+        # snapshot, so this needs at most the one query that rebuilds it.
+        catalog = get_catalog_snapshot()
+        names = catalog.names
+
         cart = request.session.get('cart', {})
         cart_categories = set()
         
         for sku in cart.keys():
-            try:
-                product = Product.objects.get(sku=sku)
-                if product.category:
-                    cart_categories.add(product.category.name)
-            except Product.DoesNotExist:
-                pass
+            category_id = catalog.sku_categories.get(sku)
+            if category_id:
+                cart_categories.add(names[category_id])
         
-        all_categories = Category.objects.filter(parent_category__isnull=True)
+        all_categories = catalog.main_categories
         
         # Action 1: If viewing a category different from preferred, suggest preferred category
         if current_category and preferred_category and current_category != preferred_category:
-            try:
-                pref_cat = Category.objects.get(name=preferred_category)
-                product_count = Product.objects.filter(category=pref_cat).count()
+            pref_cat_id = catalog.ids_by_name.get(preferred_category)
+            if pref_cat_id:
+                product_count = catalog.product_counts[pref_cat_id]
                 if product_count > 0:
                     actions.append({
                         'type': 'explore_preferred',
                         'title': f'Explore Your Favorite: {preferred_category}',
                         'description': f'Discover {product_count} products in your preferred category',
-                        'category_id': pref_cat.category_id,
+                        'category_id': pref_cat_id,
                         'category_name': preferred_category,
                         'icon': 'fa-heart',
                         'color': '#f093fb'
                     })
-            except Category.DoesNotExist:
-                pass
         
         # Action 2: If cart has items, suggest complementary categories using recommendations
         if cart:
@@ -208,42 +264,44 @@ def get_next_best_action(request, current_category=None):
             recommended_skus = get_recommendations(cart_skus, top_n=5)
             
             if recommended_skus:
-                recommended_products = Product.objects.filter(sku__in=recommended_skus)
-                recommended_categories = set()
+                recommended_categories = []
                 
-                for product in recommended_products:
-                    if product.category and product.category.name not in cart_categories:
-                        if current_category is None or product.category.name != current_category:
-                            recommended_categories.add(product.category)
+                for sku in recommended_skus:
+                    category_id = catalog.sku_categories.get(sku)
+                    if category_id and names[category_id] not in cart_categories:
+                        if current_category is None or names[category_id] != current_category:
+                            if category_id not in recommended_categories:
+                                recommended_categories.append(category_id)
                 
                 if recommended_categories:
-                    rec_cat = list(recommended_categories)[0]
-                    product_count = Product.objects.filter(category=rec_cat).count()
+                    rec_cat_id = recommended_categories[0]
+                    product_count = catalog.product_counts[rec_cat_id]
                     if product_count > 0:
                         actions.append({
                             'type': 'complementary',
-                            'title': f'Complete Your Order with {rec_cat.name}',
+                            'title': f'Complete Your Order with {names[rec_cat_id]}',
                             'description': f'Based on your cart: Browse {product_count} complementary items',
-                            'category_id': rec_cat.category_id,
-                            'category_name': rec_cat.name,
+                            'category_id': rec_cat_id,
+                            'category_name': names[rec_cat_id],
                             'icon': 'fa-plus-circle',
                             'color': '#667eea'
                         })
             else:
-                related_cats = all_categories.exclude(name__in=cart_categories)
-                if current_category:
-                    related_cats = related_cats.exclude(name=current_category)
+                related_cats = [
+                    category_id for category_id in all_categories
+                    if names[category_id] not in cart_categories and names[category_id] != current_category
+                ]
                 
-                if related_cats.exists():
-                    fallback_cat = related_cats.order_by('?').first()
-                    product_count = Product.objects.filter(category=fallback_cat).count()
+                if related_cats:
+                    fallback_cat_id = random.choice(related_cats)
+                    product_count = catalog.product_counts[fallback_cat_id]
                     if product_count > 0:
                         actions.append({
                             'type': 'complementary',
-                            'title': f'Complete Your Order with {fallback_cat.name}',
+                            'title': f'Complete Your Order with {names[fallback_cat_id]}',
                             'description': f'Browse {product_count} complementary items',
-                            'category_id': fallback_cat.category_id,
-                            'category_name': fallback_cat.name,
+                            'category_id': fallback_cat_id,
+                            'category_name': names[fallback_cat_id],
                             'icon': 'fa-plus-circle',
                             'color': '#667eea'
                         }) 
@@ -253,38 +311,38 @@ def get_next_best_action(request, current_category=None):
         if current_category:
             explored_categories.add(current_category)
         
-        unexplored = all_categories.exclude(name__in=explored_categories)
-        if unexplored.exists():
-            unexplored_cat = unexplored.order_by('?').first() 
-            product_count = Product.objects.filter(category=unexplored_cat).count()
+        unexplored = [category_id for category_id in all_categories if names[category_id] not in explored_categories]
+        if unexplored:
+            unexplored_cat_id = random.choice(unexplored)
+            product_count = catalog.product_counts[unexplored_cat_id]
             if product_count > 0:
                 actions.append({
                     'type': 'discover',
-                    'title': f'Discover {unexplored_cat.name}',
+                    'title': f'Discover {names[unexplored_cat_id]}',
                     'description': f'New to you! Check out {product_count} products',
-                    'category_id': unexplored_cat.category_id,
-                    'category_name': unexplored_cat.name,
+                    'category_id': unexplored_cat_id,
+                    'category_name': names[unexplored_cat_id],
                     'icon': 'fa-compass',
                     'color': '#10b981'
                 })
         
         # Action 4: Popular/trending category (based on product reorder quantity)
-        popular_categories = Category.objects.filter(
-            parent_category__isnull=True
-        ).annotate(
-            total_reorders=Sum('products__reorder_quantity')
-        ).exclude(name=current_category).order_by('-total_reorders')[:1]
-        
-        if popular_categories.exists():
-            pop_cat = popular_categories.first()
-            product_count = Product.objects.filter(category=pop_cat).count()
+        popular_categories = sorted(
+            (category_id for category_id in all_categories
+             if category_id in catalog.reorder_totals and names[category_id] != current_category),
+            key=lambda category_id: -catalog.reorder_totals[category_id],
+        )[:1]
+        
+        if popular_categories:
+            pop_cat_id = popular_categories[0]
+            product_count = catalog.product_counts[pop_cat_id]
             if product_count > 0:
                 actions.append({
                     'type': 'trending',
-                    'title': f'🔥 Trending: {pop_cat.name}',
+                    'title': f'🔥 Trending: {names[pop_cat_id]}',
                     'description': f'Hot picks! Explore {product_count} popular items',
-                    'category_id': pop_cat.category_id,
-                    'category_name': pop_cat.name,
+                    'category_id': pop_cat_id,
+                    'category_name': names[pop_cat_id],
                     'icon': 'fa-fire',
                     'color': '#f59e0b'
                 })
@@ -483,7 +541,12 @@ class new_userview(BaseView):
                 'number_of_children': customer_data.get('number_of_children'),
                 'monthly_income_sgd': customer_data.get('monthly_income_sgd'),
             }
-            preferred_category = predict_preferred_category(customer_preferred)
+            predict_later = getattr(settings, 'ASYNC_PREFERRED_CATEGORY', False)
+            if predict_later:
+                # Saved as PROVISIONAL_CATEGORY ('General') until the prediction lands.
+                preferred_category = []
+            else:
+                preferred_category = predict_preferred_category(customer_preferred)
 
             if is_updating_profile:
                 try:
@@ -560,6 +623,9 @@ class new_userview(BaseView):
                 request.session['customer_hasLogin'] = True
                 request.session['customer_username'] = username
                 request.session['customer_profile_picture'] = customer.profile_picture
+
+            if predict_later:
+                predict_preferred_category_later(request, customer, customer_preferred)
             
             request.session.pop('new_user', None)
             request.session.pop('new_user_username', None)
@@ -595,8 +661,6 @@ class mainpageview(BaseView):
 
         top_products = Product.objects.order_by('-reorder_quantity')[:10]
         currency_context = get_currency_context(request)
-        convert_product_prices(products, currency_context['currency_info'])
-        convert_product_prices(top_products, currency_context['currency_info'])
 
         context = {
             'main_category': main_category,
@@ -673,9 +737,8 @@ class product_detailview(BaseView):
                         pass
                 return redirect(reverse('product_detail', kwargs={'sku': sku}) + '?wishlist_removed=true')
             
-            recommended_products_sku = get_recommendations([sku], top_n=4)
-            recommended_products = Product.objects.filter(sku__in=recommended_products_sku)
-            if recommended_products_sku == []:
+            recommended_products = frequently_bought_together(sku)
+            if not recommended_products:
                 preferred_category = request.session.get('preferred_category', None)
                 if preferred_category and preferred_category != 'none':
                     recommended_products = Product.objects.filter(
@@ -688,19 +751,14 @@ class product_detailview(BaseView):
             else:
                 recommended_title = 'Frequently Bought Together'
 
-
-            convert_product_prices([product] + list(recommended_products), currency_context['currency_info'])
             
             cart = request.session.get('cart', {})
             is_in_cart = sku in cart
             
             cart_added = request.GET.get('cart_added') == 'true' or is_in_cart
-            other_products = Product.objects.none()
-            try:
-                if product.category:
-                    other_products = product.category.products.exclude(sku=sku).order_by('?')[:4]
-            except Exception:
-                other_products = Product.objects.none()
+            other_products = []
+            if product.category_id:
+                other_products = sample_category_products(product.category_id, 4, exclude=(sku,))
 
             if username:
                 in_wishlist = Wishlist.objects.filter(customer__username=username, product__sku=sku).exists()
@@ -712,6 +770,7 @@ class product_detailview(BaseView):
             context = {
                 'product': product,
                 'recommended_products': recommended_products,
+                'recommended_skus': tuple(rec.sku for rec in recommended_products),
                 'other_products': other_products,
                 'cart_added': cart_added,
                 'recommended_title': recommended_title if 'recommended_title' in locals() else False,
@@ -797,7 +856,7 @@ class cartview(BaseView):
         currency_context = get_currency_context(request)
 
         for sku, item_data in cart.items():
-            converted_unit_price = convert_cart_prices(item_data['unit_price'], currency_context['currency_info'])
+            converted_unit_price = convert_amount(item_data['unit_price'], currency_context['currency_info'])
             item_total = converted_unit_price * item_data['quantity']
             cart_items.append({
                 'sku': sku,
@@ -810,7 +869,7 @@ class cartview(BaseView):
             subtotal += item_total
         
         shipping_base = 5.00 if subtotal > 0 else 0
-        shipping = convert_cart_prices(shipping_base, currency_context['currency_info']) if shipping_base > 0 else 0
+        shipping = convert_amount(shipping_base, currency_context['currency_info']) if shipping_base > 0 else 0
         total = subtotal + shipping
 
         item_list_sku = list(cart.keys())
@@ -822,8 +881,6 @@ class cartview(BaseView):
             recommended_products = Product.objects.filter(
                 category__name=preferred_category
             ).exclude(sku__in=item_list_sku)[:4]
-
-        recommended_products = convert_product_prices(recommended_products, currency_context['currency_info'])
         
         context = {
             'cart_items': cart_items,
@@ -847,23 +904,28 @@ class all_productsview(BaseView):
         title_name = "All Products"
         
         products_list = Product.objects.all()
+        category_tree = get_category_tree()
+        category = None
         
         if category_id and category_id != 'all':
-            try:
-                category = Category.objects.get(category_id=category_id)
-                if category.subcategories.exists():
-                    title_name = category.name
-                    subcategory_ids = [subcat.category_id for subcat in category.subcategories.all()]
-                    subcategory_ids.append(category_id) 
-                    products_list = products_list.filter(category__in=subcategory_ids)
-                else:
-                    title_name = category.name
-                    products_list = products_list.filter(category=category_id)
-            except Category.DoesNotExist:
-                pass
+            category = category_tree.get(category_id)
+            if category:
+                title_name = category.name
+                # Products filed under this category or any category below it.
+                products_list = products_list.filter(**Category.subtree_filter(category.id_path, 'category_path'))
         
         if search_query:
-            products_list = products_list.filter(product_name__icontains=search_query)
+            products_list = search_products(products_list, search_query, ranked=sort_by == 'relevance')
+
+        # Facet counts come from the cached facet index, or from one grouped
+        # query over the matches when searching.
+        selected_facets = {facet: request.GET.getlist(facet) for facet in FACETS}
+        if search_query:
+            facet_rows, facet_path = grouped_counts(products_list), None
+        else:
+            facet_rows, facet_path = get_facet_index(), category.id_path if category else None
+        for facet_filter in facet_filters(selected_facets).values():
+            products_list = products_list.filter(facet_filter)
         
         if sort_by == 'name-asc':
             products_list = products_list.order_by('product_name')
@@ -878,63 +940,110 @@ class all_productsview(BaseView):
         elif sort_by == 'rating-asc':
             products_list = products_list.order_by('product_rating')
         
-        main_categories = Category.objects.filter(parent_category__isnull=True).order_by('name')
-        all_categories = Category.objects.all().order_by('name')
-        
-        paginator = Paginator(products_list, 20)
-        page_number = request.GET.get('page', 1)
-        
-        try:
-            products = paginator.page(page_number)
-        except:
-            products = paginator.page(1)
+        main_categories = category_tree.sorted_by_name(category_tree.main_categories)
+        all_categories = category_tree.sorted_by_name()
+        
+        # keyset_page() has no cursor for the bm25 order of a relevance
+        # search (scores shift as the index changes); those page by offset.
+        ranked = bool(search_query) and sort_by == 'relevance'
+        keyset = getattr(settings, 'PRODUCT_KEYSET_PAGINATION', False) and not ranked
+        if keyset:
+            # Seeks from the cursor instead of counting and skipping rows.
+            paginator = None
+            products = keyset_page(products_list, sort_by, request.GET.get('cursor'), per_page=20)
+            total_products = approximate_count(products_list)
+            is_paginated = products.has_next or products.has_previous
+        else:
+            paginator = Paginator(products_list, 20)
+            page_number = request.GET.get('page', 1)
+            
+            try:
+                products = paginator.page(page_number)
+            except:
+                products = paginator.page(1)
+            total_products = paginator.count
+            is_paginated = paginator.num_pages > 1
         
         currency_context = get_currency_context(request)
-        convert_product_prices(products, currency_context['currency_info'])
         
-        if category_id and category_id != 'all':
-            try:
-                category = Category.objects.get(category_id=category_id)
-                browsing_history = request.session.get('browsing_history', [])
-                if category.name not in browsing_history:
-                    browsing_history.append(category.name)
-                    request.session['browsing_history'] = browsing_history[-5:]
-                    request.session.modified = True
-            except Category.DoesNotExist:
-                pass
+        if category:
+            browsing_history = request.session.get('browsing_history', [])
+            if category.name not in browsing_history:
+                browsing_history.append(category.name)
+                request.session['browsing_history'] = browsing_history[-5:]
+                request.session.modified = True
         
         current_category_name = title_name if title_name != "All Products" else None
         next_best_actions = get_next_best_action(request, current_category_name)
 
+        facets = facet_options(
+            facet_counts(facet_rows, selected_facets, facet_path), selected_facets,
+            lambda facet, value: self.toggle_url(request, facet, value), currency_context['currency_info'],
+        )
+        # Category and facet parameters for the page-number links.
+        filter_query = urlencode(
+            [('category', category_id)] * bool(category_id) +
+            [(facet, value) for facet in FACETS for value in selected_facets[facet]]
+        )
+
         context = {
             'all_products': products_list,
             'products': products,
             'paginator': paginator,
             'page_obj': products,
-            'is_paginated': paginator.num_pages > 1,
+            'is_paginated': is_paginated,
+            'keyset': keyset,
             'search_query': search_query,
             'sort_by': sort_by,
             'selected_category': category_id,
             'main_categories': main_categories,
             'all_categories': all_categories,
-            'total_products': products_list.count(),
+            'total_products': total_products,
             'title_name': title_name,
             'next_best_actions': next_best_actions,
+            'facets': facets,
+            'filter_query': filter_query,
+            # Everything the product grid depends on besides the catalog itself.
+            'grid_key': (
+                currency_context['selected_currency'], keyset,
+                tuple(sorted((key, tuple(values)) for key, values in request.GET.lists() if key != 'currency')),
+            ),
         }
+        if keyset:
+            context['previous_url'] = self.cursor_url(request, products.previous_cursor)
+            context['next_url'] = self.cursor_url(request, products.next_cursor)
         context.update(currency_context)
 
         return self.render_with_base(request, self.template_name, context)
 
+    def toggle_url(self, request, facet, value):
+        params = request.GET.copy()
+        params.pop('page', None)
+        params.pop('cursor', None)
+        values = params.getlist(facet)
+        params.setlist(facet, [v for v in values if v != value] if value in values else values + [value])
+        return '?' + params.urlencode()
+
+    def cursor_url(self, request, cursor):
+        if cursor is None:
+            return None
+        params = request.GET.copy()
+        params.pop('page', None)
+        params['cursor'] = cursor
+        return '?' + params.urlencode()
+
 class search_ajax_view(BaseView):
     def get(self, request, *args, **kwargs):
         search_query = request.GET.get('q', '').strip()
+        if request.GET.get('mode') == 'autocomplete':
+            return self.autocomplete(request, search_query)
         products_list = Product.objects.none()
         
         if search_query and len(search_query) >= 1: 
-            products_list = Product.objects.filter(product_name__icontains=search_query)
+            # Best matches first, over names, descriptions and category names.
+            products_list = search_products(Product.objects.select_related('category'), search_query, ranked=True)
         
         currency_context = get_currency_context(request)
-        convert_product_prices(products_list, currency_context['currency_info'])
         
         results = []
         for product in products_list:
@@ -942,7 +1051,7 @@ class search_ajax_view(BaseView):
                 'sku': product.sku,
                 'name': product.product_name,
                 'description': product.description[:100] + '...' if len(product.description) > 100 else product.description,
-                'price': str(product.unit_price),
+                'price': str(product_price(product, currency_context['currency_info'])),
                 'currency_symbol': currency_context['currency_symbol'],
                 'image_url': product.product_image if product.product_image else None,
                 'category': product.category.name if product.category else None,
@@ -954,6 +1063,34 @@ class search_ajax_view(BaseView):
             'query': search_query,
             'total_count': len(results)
         })
+
+    def autocomplete(self, request, search_query):
+        """Top matches from the in-process prefix index, without touching the database."""
+        try:
+            limit = max(1, min(int(request.GET.get('limit', 8)), 20))
+        except ValueError:
+            limit = 8
+        currency_context = get_currency_context(request)
+
+        results = [{
+            'sku': suggestion.sku,
+            'name': suggestion.name,
+            'price': str(product_price(suggestion, currency_context['currency_info'])),
+            'currency_symbol': currency_context['currency_symbol'],
+            'image_url': suggestion.image_url,
+            'category': suggestion.category,
+            'product_url': f"/product/{suggestion.sku}/",
+        } for suggestion in get_prefix_index().search(search_query, limit=limit)]
+
+        response = JsonResponse({
+            'results': results,
+            'query': search_query,
+            'total_count': len(results)
+        })
+        # Prices follow the session's currency, so only the browser may reuse it.
+        response['Cache-Control'] = f"private, max-age={getattr(settings, 'AUTOCOMPLETE_MAX_AGE', 60)}"
+        patch_vary_headers(response, ['Cookie'])
+        return response
     
 class checkout_page(BaseView):
     template_name = 'customer_website/checkout.html'
@@ -1155,7 +1292,7 @@ class checkout_page(BaseView):
         currency_context = get_currency_context(request)
 
         for sku, item_data in cart.items():
-            converted_unit_price = convert_cart_prices(item_data['unit_price'], currency_context['currency_info'])
+            converted_unit_price = convert_amount(item_data['unit_price'], currency_context['currency_info'])
             item_total = converted_unit_price * item_data['quantity']
             cart_items.append({
                 'sku': sku,
@@ -1168,7 +1305,7 @@ class checkout_page(BaseView):
             subtotal += item_total
   
         shipping_base = Decimal('5.00') if subtotal > 0 else Decimal('0.00')
-        shipping = convert_cart_prices(shipping_base, currency_context['currency_info']) if shipping_base > 0 else Decimal('0.00')
+        shipping = convert_amount(shipping_base, currency_context['currency_info']) if shipping_base > 0 else Decimal('0.00')
         tax_rate = Decimal('0.08')
         tax_amount = subtotal * tax_rate
         
@@ -1437,11 +1574,11 @@ class order_confirmation_page(BaseView):
             
             order_total = Decimal('0.00')
             for item in order_items:
-                item.converted_price = convert_cart_prices(item.price_at_purchase, currency_context['currency_info'])
+                item.converted_price = convert_amount(item.price_at_purchase, currency_context['currency_info'])
                 item.item_total = item.converted_price * item.quantity
                 order_total += item.item_total
             
-            order.converted_total = convert_cart_prices(order.total_amount, currency_context['currency_info'])
+            order.converted_total = convert_amount(order.total_amount, currency_context['currency_info'])
 
             context = {
                 'order': order,
@@ -1493,7 +1630,7 @@ class profile_page(BaseView):
             order_total = Decimal('0.00')
             order_items = list(order.items.all())
             for item in order_items:
-                item.converted_price = convert_cart_prices(item.price_at_purchase, currency_context['currency_info'])
+                item.converted_price = convert_amount(item.price_at_purchase, currency_context['currency_info'])
                 item_total = item.converted_price * item.quantity
                 order_total += item_total
                 
@@ -1792,7 +1929,7 @@ class wishlist_view(BaseView):
         wishlist_products = []
         for wishlist_item in wishlist_items:
             product = wishlist_item.product
-            converted_price = convert_cart_prices(product.unit_price, currency_context['currency_info'])
+            converted_price = product_price(product, currency_context['currency_info'])
             wishlist_products.append({
                 'wishlist_id': wishlist_item.wishlist_id,
                 'sku': product.sku,